@@ -0,0 +1,119 @@
+'''
+设备模型内存基准：生成 10k 个虚拟模型的设备列表，测量 Device/DeviceIndex 以及
+每个实体引用的 device_info 在每个设备上占用的字节数。
+
+同时测量云端返回的原始设备列表本身的占用。旧版本的 AnxinJiaStore 在条目的整个生命周期内
+常驻这份列表；现在设备登记完成后缓存由 Device 对象生成，原始列表不再保留。
+
+用法：
+    python benchmarks/device_memory.py [--virtual-models 10000] [--per-device 4]
+
+只加载 device.py、models.py 及其依赖的纯 Python 模块，不需要安装 Home Assistant。
+'''
+import argparse
+import gc
+import importlib
+import json
+import os
+import sys
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(ROOT, "custom_components", "anxinjia_iot")
+
+def load_device_module():
+    """以不执行 __init__.py 的方式加载集成包中的 device 模块。
+
+    设备类型注册表在建立索引时才导入，这里提前导入，避免模块本身的分配计入测量结果。
+    """
+    package = types.ModuleType("anxinjia_iot")
+    package.__path__ = [PACKAGE_DIR]
+    sys.modules["anxinjia_iot"] = package
+    importlib.import_module("anxinjia_iot.models")
+    return importlib.import_module("anxinjia_iot.device")
+
+def make_raw_devices(virtual_models: int, per_device: int) -> list[dict]:
+    """生成与 pageList 接口返回格式一致的设备列表，经过 JSON 往返以得到与真实解析一致的独立字符串。"""
+    rooms = ["客厅", "主卧", "次卧", "书房", "厨房", "餐厅", "卫生间", "阳台"]
+    devices = []
+    for i in range(virtual_models // per_device):
+        devices.append({
+            "houseName": "我的家",
+            "houseUid": "house-0001",
+            "roomName": rooms[i % len(rooms)],
+            "projectId": "project-0001",
+            "eqNumber": f"EQ{i:08d}",
+            "eqName": "四路开关面板",
+            "eqType": "switch",
+            "modelType": "102001",
+            "supplierType": "aciga",
+            "online": 1,
+            "physicsId": "P102001",
+            "icon": "switch",
+            "iconUrl": "https://service.aciga.com.cn/static/icon/switch.png",
+            "physicsName": "智能开关",
+            "userId": "user-0001",
+            "createTime": "2025-02-24 20:02:36",
+            "eqUid": f"uid-{i:08d}",
+            "eqId": i,
+            "addressId": "address-0001",
+            "virtualModels": [
+                {"virtualNumber": f"V{i:08d}{j}", "virtualName": f"开关{j + 1}", "modelType": 102001}
+                for j in range(per_device)
+            ],
+        })
+    return json.loads(json.dumps(devices, ensure_ascii=False))
+
+def measure(device_module, raw_devices: list[dict]) -> int:
+    """返回创建 Device 对象、建立索引并为每个虚拟模型的实体取得 device_info 所分配的字节数。"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    index = device_module.DeviceIndex()
+    for data in raw_devices:
+        index.add(device_module.Device(data))
+    # 每个实体持有一份 device_info 引用
+    entity_device_infos = [device.device_info for device in index for _ in device.virtual_models]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del index, entity_device_infos
+    return allocated
+
+def measure_raw(raw_devices: list[dict]) -> int:
+    """返回一份解析后的原始设备列表（缓存读取或云端响应）所分配的字节数。"""
+    payload = json.dumps(raw_devices, ensure_ascii=False)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    devices = json.loads(payload)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del devices
+    return allocated
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--virtual-models", type=int, default=10000)
+    parser.add_argument("--per-device", type=int, default=4)
+    args = parser.parse_args()
+
+    device_module = load_device_module()
+    raw_devices = make_raw_devices(args.virtual_models, args.per_device)
+    allocated = measure(device_module, raw_devices)
+    devices = len(raw_devices)
+    virtual_models = devices * args.per_device
+
+    print(f"设备数: {devices}, 虚拟模型数: {virtual_models}")
+    print(f"总占用: {allocated / 1024:.1f} KiB")
+    print(f"每个设备: {allocated / devices:.0f} B")
+    print(f"每个虚拟模型: {allocated / virtual_models:.0f} B")
+
+    raw = measure_raw(raw_devices)
+    print(f"原始设备列表: {raw / 1024:.1f} KiB, 每个设备 {raw / devices:.0f} B（现在登记完成后释放）")
+    print(f"旧版本常驻合计: 每个设备 {(allocated + raw) / devices:.0f} B")
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,25 @@ import json
 import os
 import logging
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.components.persistent_notification import async_create
-from .const import DOMAIN
-from .device import Device
-from .api import fetch_devices,TokenExpiredError
+from datetime import timedelta
+from .const import DOMAIN,CONF_USER_ID,RATE_LIMITS,SCHEDULER_MAX_INFLIGHT,SCHEDULER_RESERVED,DEVICE_SYNC_INTERVAL
+from .device import Device,DeviceIndex
+from .models import get_model,scene_mode_virtual_number
+from .api import fetch_devices,TokenExpiredError,AnxinJiaClient,ConnectionPool
+from .catalogue import DeviceCatalogue
+from .coordinator import AnxinJiaCoordinator
+from .store import AnxinJiaStore
+from .auth import TokenManager
+from .ratelimit import RateLimiter
+from .scheduler import RequestScheduler
+from .services import async_setup_services
 
 PLATFORMS = [
     "cover",
@@ -60,78 +72,200 @@ async def async_setup(hass: HomeAssistant, config:dict) -> bool:
 
     hass.data.setdefault(DOMAIN, {})
 
-    # 将重新加载函数存储在 hass.data 中，以便在后续调用
-    hass.data[DOMAIN] = {
-        #"reload_entry": reload_entry,
-        "addressId": None
-        # 可存储其他数据
-    }
+    # 各配置条目的数据按 entry_id 存放，连接池、限流器和请求调度器由所有条目共享
+    hass.data[DOMAIN].setdefault("pool", ConnectionPool())
+    hass.data[DOMAIN].setdefault("rate_limiter", RateLimiter(RATE_LIMITS))
+    hass.data[DOMAIN].setdefault(
+        "scheduler", RequestScheduler(SCHEDULER_MAX_INFLIGHT, SCHEDULER_RESERVED)
+    )
+    hass.data[DOMAIN].setdefault("devices", {})
+    async_setup_services(hass)
     return True
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
-    try:
-        devices_data = await fetch_devices(hass, config_entry)
-    except TokenExpiredError:
-        # 处理令牌过期的情况
-        _LOGGER.warning("Token expired. Prompting user to reauthorize.")
-        # 设备拉取失败，发出通知
-        await notify_user(hass)
-        return False
-
-    hass.data[DOMAIN].setdefault('devices', {})
-    # 初始化当前配置条目的设备列表
-    hass.data[DOMAIN]['devices'][config_entry.entry_id] = []
+    # 每个配置条目共用一个带连接池的客户端，令牌过期时自动重新登录
+    token_manager = TokenManager(
+        hass, config_entry, on_expired=lambda: hass.async_create_task(notify_user(hass))
+    )
+    client = AnxinJiaClient(
+        hass.data[DOMAIN]["pool"],
+        token_manager,
+        config_entry.data.get(CONF_USER_ID),
+        hass.data[DOMAIN]["rate_limiter"],
+        hass.data[DOMAIN]["scheduler"],
+    )
+    store = AnxinJiaStore(hass, config_entry.entry_id)
+
+    cached = await store.async_load()
+    if cached:
+        # 有缓存时直接用缓存创建实体，云端发现链路放到后台增量同步
+        _LOGGER.debug("使用缓存的设备列表启动")
+        client.address_id = store.address_id
+        client.address_ids = store.address_ids
+
+    # 初始化当前配置条目的设备索引与设备目录
+    index = DeviceIndex()
+    hass.data[DOMAIN]['devices'][config_entry.entry_id] = index
+    catalogue = DeviceCatalogue(
+        hass, config_entry, client, store, index,
+        on_expired=token_manager.async_mark_expired,
+    )
     
     config_entry.async_on_unload(config_entry.add_update_listener(async_reload_entry))
 
-    if not devices_data or not isinstance(devices_data, list):
-        _LOGGER.warning("没有获取到设备信息")
-        return False
-    
-    # 获取设备注册表实例
-    device_registry = dr.async_get(hass)  # 这里只需要传递 hass 实例
+    # 每个地址一个状态协调器，同一地址的所有平台共用，各地址之间并发轮询
+    coordinators = {}
+    catalogue.coordinators = coordinators
+    if cached:
+        # 注册缓存的设备并加入索引
+        for device_info in store.devices:
+            catalogue.async_register_device(Device(device_info))
+        for address_id, devices in index.houses.items():
+            coordinators[address_id] = AnxinJiaCoordinator(
+                hass,
+                client,
+                [device.eq_number for device in devices if get_model(device.model_type).polled],
+                address_id,
+                index=index,
+            )
+            # 实体创建时先显示上次保存的状态，不等待云端
+            coordinators[address_id].async_restore(store.snapshot)
+    # 之后的缓存由索引中的 Device 对象生成，不再保留原始设备列表
+    store.attach(index)
 
-    # 注册设备
-    for device_info in devices_data:
-        device = Device(device_info)
-        
-        # 创建或获取设备注册表
-        device_entry = device_registry.async_get_or_create(
-            config_entry_id=config_entry.entry_id,
-            identifiers={(DOMAIN, device.eq_number)},
-            name= f"{device.name}",
-            model=f"aciga.{device.physics_id}.{device.model_type}",
-            serial_number = device.eq_uid,
-            manufacturer="aciga",
-            sw_version="v1.1",
-            hw_version="v1.0",
-            configuration_url = device.icon_url,
-            suggested_area=device.room_name,
-            connections={(dr.CONNECTION_NETWORK_MAC, device.eq_number)}
-        )
-        # 将设备信息添加到 hass.data 中
-        hass.data[DOMAIN]['devices'][config_entry.entry_id].append(device)
+    await async_migrate_scene_mode_ids(hass, config_entry)
+
+    hass.data[DOMAIN][config_entry.entry_id] = {
+        "client": client,
+        "coordinators": coordinators,
+        "store": store,
+        "token_manager": token_manager,
+        "catalogue": catalogue,
+    }
 
     # 注册其它实体
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+
+    if not cached:
+        # 首次启动没有缓存：平台已就绪，设备列表每到达一页就登记设备并创建实体
+        try:
+            devices_data = await fetch_devices(client, on_devices=catalogue.async_add_devices)
+        except TokenExpiredError:
+            # 处理令牌过期的情况
+            _LOGGER.warning("Token expired. Prompting user to reauthorize.")
+            # 设备拉取失败，发出通知
+            await notify_user(hass)
+            await _async_teardown(hass, config_entry)
+            return False
+        if not devices_data or not isinstance(devices_data, list):
+            _LOGGER.warning("没有获取到设备信息")
+            await _async_teardown(hass, config_entry)
+            return False
+        if not await store.async_update_devices(devices_data, client.address_id, client.address_ids):
+            # 设备已在分页时登记到索引，与索引一致时也要写入第一份缓存
+            await store.async_save()
+        scenes = hass.data[DOMAIN][config_entry.entry_id].get("scenes")
+        if scenes is not None:
+            # 地址和场景面板都已确定，补一次场景同步
+            config_entry.async_create_background_task(
+                hass, scenes.async_sync(), f"{DOMAIN}_scene_sync"
+            )
+
+    # 第一次轮询在后台进行，启动流程不等待云端
+    for address_id, coordinator in coordinators.items():
+        config_entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN}_first_refresh_{address_id}"
+        )
+
+    # 低优先级的后台设备发现，增量地增加、移除或重命名实体，不重新加载条目
+    @callback
+    def _schedule_discovery(_now=None) -> None:
+        config_entry.async_create_background_task(
+            hass, catalogue.async_sync(), f"{DOMAIN}_device_sync"
+        )
+
+    config_entry.async_on_unload(
+        async_track_time_interval(hass, _schedule_discovery, timedelta(seconds=DEVICE_SYNC_INTERVAL))
+    )
+    if cached:
+        _schedule_discovery()
+
+    async def _async_save_snapshot_on_stop(_event: Event) -> None:
+        await async_save_snapshot(hass, config_entry)
+
+    config_entry.async_on_unload(
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_save_snapshot_on_stop)
+    )
     
     return True
 
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """卸载配置条目。"""
+    await async_save_snapshot(hass, config_entry)
+    await _async_teardown(hass, config_entry)
+    return True
+
+async def _async_teardown(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """卸载平台并释放当前配置条目的协调器与客户端。"""
     await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
-    # 清理任何注册的组件或服务
-    hass.data[DOMAIN].pop('devices', None)  # 清除设备数据
+    # 只清理当前配置条目的设备数据，其它条目不受影响
+    hass.data[DOMAIN]['devices'].pop(config_entry.entry_id, None)
     """Unload a config entry."""
     data = hass.data[DOMAIN].get(config_entry.entry_id)
     if data is not None:
         hass.data[DOMAIN].pop(config_entry.entry_id)
-    return True
+        for coordinator in data["coordinators"].values():
+            await coordinator.async_shutdown()
+        # 释放该条目对共享连接池的引用
+        await data["client"].async_close()
     
+async def async_migrate_scene_mode_ids(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """旧版本的场景模式开关 unique_id 为 virtual_switch_N，所有面板共用；迁移为带面板 eqNumber 的 id。"""
+    device_registry = dr.async_get(hass)
+
+    @callback
+    def _migrate(entity_entry: er.RegistryEntry):
+        if not entity_entry.unique_id.startswith("virtual_switch_") or entity_entry.device_id is None:
+            return None
+        device_entry = device_registry.async_get(entity_entry.device_id)
+        eq_number = next(
+            (identifier for domain, identifier in (device_entry.identifiers if device_entry else ()) if domain == DOMAIN),
+            None,
+        )
+        if eq_number is None:
+            return None
+        i = entity_entry.unique_id.removeprefix("virtual_switch_")
+        return {"new_unique_id": scene_mode_virtual_number(eq_number, i)}
+
+    await er.async_migrate_entries(hass, config_entry.entry_id, _migrate)
+
+async def async_save_snapshot(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """保存所有地址的最近已知状态，下次启动时用于恢复实体状态。"""
+    data = hass.data[DOMAIN].get(config_entry.entry_id)
+    if data is None:
+        return
+    snapshot = {}
+    for coordinator in data["coordinators"].values():
+        snapshot.update(coordinator.snapshot())
+    try:
+        await data["store"].async_update_snapshot(snapshot)
+    except Exception as e:
+        _LOGGER.warning(f"保存状态快照失败: {e}")
+    else:
+        _LOGGER.debug(f"已保存 {len(snapshot)} 个实体的状态快照")
+
 async def async_reload_entry(hass: HomeAssistant, config_entry: ConfigEntry)-> None:
     """处理配置更新。"""
+    data = hass.data[DOMAIN].get(config_entry.entry_id)
+    if data is not None and data["token_manager"].owns_entry_data(config_entry.data):
+        # 令牌管理器自动刷新后写回的令牌，不需要重新加载
+        return
     await hass.config_entries.async_reload(config_entry.entry_id)
     
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """删除配置条目时一并删除本地缓存。"""
+    await AnxinJiaStore(hass, config_entry.entry_id).async_remove()
+
 async def async_remove_config_entry_device(
     hass: HomeAssistant, config_entry: ConfigEntry , device_entry: dr.DeviceEntry
 ) -> bool:
@@ -14,211 +14,428 @@ import hashlib
 import json
 import time
 import logging
-from typing import Optional
-from homeassistant.core import HomeAssistant
-from homeassistant.config_entries import ConfigEntry
-from .const import DOMAIN,CONF_TOKEN,CONF_USER_ID
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from .const import DOMAIN,STATUS_CHUNK_SIZE,STATUS_MAX_CONCURRENCY,SCENE_DEDUPE_WINDOW,DEVICE_PAGE_SIZE
+from .retry import RetryPolicy,DEFAULT_RETRY_POLICY
+from .discovery import DiscoveryPlan,DiscoveryError
+from .paging import Page,DevicePageError,async_iter_pages
+from .auth import TokenManager
+from .ratelimit import RateLimiter
+from .scheduler import RequestScheduler
+from .commands import CommandQueues,ScenePipeline
+from .status import DeviceStatus
+from .models import get_model
 
 # 创建 logger 实例
 _LOGGER = logging.getLogger(__name__)
 
-# 定义全局变量 access_token
-access_token = None
-
-def set_access_token(token):
-    global access_token
-    access_token = token
-
-def get_access_token():
-    return access_token
-    
-async def fetch_AddressId_Devices(addressId:str,retries: int = 3):
-
-    IMPORT_AddrDevice_URL = "https://service.aciga.com.cn/IntelligentHome/addressDeviceManagement/addressDevice/pageList"
-    if access_token is None:
-        _LOGGER.error("Token 无效")
-        return None
+# 连接池参数：同一时间到 service.aciga.com.cn 的最大连接数、DNS 缓存与长连接保持时间
+CONNECTOR_LIMIT = 20
+CONNECTOR_LIMIT_PER_HOST = 10
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
+
+# 各接口的重试策略，未列出的接口使用 DEFAULT_RETRY_POLICY
+ENDPOINT_RETRY_POLICIES: dict[str, RetryPolicy] = {
+    # 启动时的设备发现链路：失败代价高，多重试一次
+    "address_devices": RetryPolicy(attempts=4),
+    "user_devices": RetryPolicy(attempts=4),
+    "user_detail": RetryPolicy(attempts=3),
+    "default_room": RetryPolicy(attempts=3),
+    "factory_token": RetryPolicy(attempts=3),
+    "active_address": RetryPolicy(attempts=3),
+    "floor_device": RetryPolicy(attempts=3),
+    "account_eq_house": RetryPolicy(attempts=3),
+    "scene_query": RetryPolicy(attempts=3),
+    # 状态轮询：下个周期还会再查，快速失败即可
+    "device_status": RetryPolicy(attempts=2, base_delay=0.3, max_delay=1.0),
+    # 控制命令设置的是绝对状态，可以安全重试，但等待要短以免用户感知到延迟
+    "control": RetryPolicy(attempts=3, base_delay=0.2, max_delay=1.0),
+    # 场景执行不是幂等的，只在连接建立失败时重试
+    "scene_run": RetryPolicy(attempts=2, base_delay=0.2, max_delay=1.0, idempotent=False),
+    # 登录失败通常是凭据问题，只重试连接失败
+    "login": RetryPolicy(attempts=2, idempotent=False),
+}
+
+class ConnectionPool:
+    """所有配置条目共享的连接池。
+
+    持有唯一的 TCPConnector/ClientSession，各条目的 AnxinJiaClient 通过 acquire/async_release
+    引用计数，最后一个使用者释放时关闭。
+    """
 
-    _LOGGER.debug("开始获取导入设备列表...")
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._users = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """返回共享的 ClientSession，首次使用或已关闭时重新创建。"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=CONNECTOR_LIMIT,
+                limit_per_host=CONNECTOR_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=True,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+        return self._session
+
+    def acquire(self) -> "ConnectionPool":
+        """登记一个使用者。"""
+        self._users += 1
+        return self
+
+    async def async_release(self) -> None:
+        """注销一个使用者，没有使用者时关闭连接池。"""
+        self._users = max(0, self._users - 1)
+        if self._users == 0 and self._session is not None and not self._session.closed:
+            await self._session.close()
+            self._session = None
+
+class AnxinJiaClient:
+    """安心加云端 HTTP 客户端，保存单个配置条目的全部 API 状态。
+
+    每个配置条目持有一个实例，令牌、user_id 与 addressId 都属于该实例；
+    请求经共享的连接池、限流器和优先级调度器发送，收到 401 时由 token_manager 重新登录后重放。
+    """
 
+    def __init__(self, pool: Optional[ConnectionPool] = None, token_manager: Optional[TokenManager] = None, user_id: Optional[str] = None, rate_limiter: Optional[RateLimiter] = None, scheduler: Optional[RequestScheduler] = None):
+        # 未传入连接池时（例如配置流程中的临时客户端）使用独占的连接池
+        self._pool = (pool or ConnectionPool()).acquire()
+        self.token_manager = token_manager
+        self.rate_limiter = rate_limiter
+        self.scheduler = scheduler
+        self.commands = CommandQueues()
+        self.scene_runner = ScenePipeline(
+            lambda scene_id, scene_name: async_run_SceneService(self, scene_id, scene_name),
+            SCENE_DEDUPE_WINDOW,
+        )
+        self.user_id = user_id
+        # address_id 为默认地址，address_ids 为账号可访问的全部地址（房屋）
+        self.address_id: Optional[str] = None
+        self.address_ids: list[str] = []
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """返回底层共享的 ClientSession。"""
+        return self._pool.session
+
+    @property
+    def token(self) -> Optional[str]:
+        """当前访问令牌。"""
+        return self.token_manager.token if self.token_manager is not None else None
+
+    async def async_post(self, url: str, headers: Optional[dict] = None, json=None, data=None, timeout: Optional[aiohttp.ClientTimeout] = None, endpoint: Optional[str] = None) -> dict:
+        """发送 POST 请求并返回 JSON 响应，HTTP 状态码异常时抛出 ClientResponseError。
+
+        按 endpoint 对应的 RetryPolicy 对值得重试的错误做指数退避重试，成功时立即返回。
+        """
+        policy = ENDPOINT_RETRY_POLICIES.get(endpoint, DEFAULT_RETRY_POLICY)
+        attempt = 1
+        replayed = False
+        while True:
+            token = None
+            if self.token_manager is not None and headers and "Authorization" in headers:
+                token = self.token_manager.token
+                headers = {**headers, "Authorization": token}
+            if self.rate_limiter is not None:
+                await self.rate_limiter.async_acquire(endpoint)
+
+            async def _send(headers=headers):
+                async with self.session.post(url, headers=headers, json=json, data=data, timeout=timeout or DEFAULT_TIMEOUT) as response:
+                    response.raise_for_status()  # 如果响应状态码不是 200，会抛出异常
+                    return await response.json()
+
+            try:
+                if self.scheduler is not None:
+                    return await self.scheduler.async_run(endpoint, _send)
+                return await _send()
+            except Exception as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status == 401 and token is not None and not replayed:
+                    # 并发请求共用同一次重新登录，拿到新令牌后重放
+                    new_token = await self.token_manager.async_refresh(self._async_login, token)
+                    if not new_token:
+                        raise
+                    replayed = True
+                    _LOGGER.debug(f"{endpoint or url} 使用新令牌重放请求")
+                    continue
+                if attempt >= policy.attempts or not policy.should_retry(e):
+                    raise
+                delay = policy.backoff(attempt)
+                _LOGGER.warning(f"{endpoint or url} 请求失败: {e!r}, {delay:.2f}s 后重试 {attempt}/{policy.attempts - 1}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _async_login(self, username: str, password: str) -> Optional[dict]:
+        return await async_login_auth2(self, username, password)
+
+    async def async_close(self) -> None:
+        """取消未完成的场景执行，并释放对连接池的引用。"""
+        self.scene_runner.cancel()
+        if self._pool is not None:
+            await self._pool.async_release()
+            self._pool = None
+
+async def _async_fetch_device_page(client: AnxinJiaClient, url: str, payload: dict, endpoint: str, extract: Callable[[dict], Page]) -> Optional[Page]:
+    """请求设备列表的一页，失败时返回 None，令牌过期时抛出 TokenExpiredError。"""
     # 构建请求头
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
         "traceId": generate_trace_id()
     }
-
-    # 构建请求体
-    payload = {
-      "addressId": addressId,
-      "fullFlag": True,
-      "pageNo": 100,
-      "pageSize": 20
-    }
-    last_exception = None  # 存储最后一次异常
-    timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-    for attempt in range(retries):
-        try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(IMPORT_AddrDevice_URL, headers=headers, json=payload, timeout=timeout) as response:
-                    response.raise_for_status()  # 检查 HTTP 状态码
-                    response_json = await response.json()
-                    if response_json.get("success"):
-                        lists = response_json.get("data") or None
-                        if lists:
-                            devices = lists.get("list")
-                            _LOGGER.debug(f"导入设备列表请求成功:{response_json}")
-                            return devices
-                        else:
-                            _LOGGER.debug(f"导入设备列表 为空:{response_json}")
-                            return None
-                    else:
-                        _LOGGER.error("导入设备信息失败, 原因: %s", response_json.get("msg"))
-                        return None
-        except aiohttp.ClientResponseError as e:
-            if e.status in {400, 401, 403, 404}:
-                _LOGGER.warning(f"导入设备时请求失败 - {e.status}: {e.message}")
-                if e.status == 401:
-                    raise TokenExpiredError("Access token has expired.")
-                else:
-                    last_exception = e
-                    # 不抛出异常，继续重试
-            else:
-                _LOGGER.warning(f"导入设备时服务器错误: {e.status}, 尝试重试 {attempt + 1}/{retries}")
-                last_exception = e
-        except aiohttp.ClientError as e:  # 捕获所有 aiohttp 的异常，包括连接错误和超时
-            _LOGGER.warning(f"导入设备时连接失败: {e}, 尝试重试 {attempt + 1}/{retries}")
-            last_exception = e
-        except Exception as e:
-            _LOGGER.warning(f"导入设备时发生未知错误: {e}, 不进行重试。")
-            last_exception = e
-            break
-        finally:
-            await asyncio.sleep(2)  # 可选：在重试之间等待一段时间
-
-    # 如果所有尝试都失败,记录最后的异常
-    if last_exception:
-        _LOGGER.error(f"导入设备信息失败,最后的异常: {last_exception}")
+    try:
+        response_json = await client.async_post(url, headers=headers, json=payload, endpoint=endpoint)
+        if response_json.get("success"):
+            page = extract(response_json)
+            _LOGGER.debug(f"导入设备列表第 {payload.get('pageNo')} 页请求成功: {len(page.items or [])} 个设备")
+            return page
+        else:
+            _LOGGER.error("导入设备信息失败, 原因: %s", response_json.get("msg"))
+            return None
+    except aiohttp.ClientResponseError as e:
+        _LOGGER.warning(f"导入设备时请求失败 - {e.status}: {e.message}")
+        if e.status == 401:
+            raise TokenExpiredError("Access token has expired.")
+        _LOGGER.error(f"导入设备信息失败,最后的异常: {e}")
+    except aiohttp.ClientError as e:  # 捕获所有 aiohttp 的异常，包括连接错误和超时
+        _LOGGER.error(f"导入设备时连接失败,最后的异常: {e}")
+    except Exception as e:
+        _LOGGER.error(f"导入设备时发生未知错误: {e}")
     return None
 
-async def fetch_user_devices(retries: int = 3):
+async def _async_collect_pages(pages: AsyncIterator[list], on_page: Optional[Callable[[list], Awaitable[None]]] = None) -> Optional[list]:
+    """收集所有页面；每页到达后先交给 on_page 处理。任一页失败时返回 None。"""
+    devices = []
+    try:
+        async for page in pages:
+            if on_page is not None:
+                await on_page(page)
+            devices.extend(page)
+    except DevicePageError as e:
+        _LOGGER.error(f"导入设备列表失败: {e}")
+        return None
+    return devices
 
-    IMPORT_UserDevice_URL = "https://service.aciga.com.cn/IntelligentHome/addressDeviceManagement/userDevice/needImport"
-    if access_token is None:
+async def fetch_AddressId_Devices(client: AnxinJiaClient,addressId:str, on_page: Optional[Callable[[list], Awaitable[None]]] = None):
+    """分页获取地址下的全部设备，每页到达后调用 on_page。"""
+    IMPORT_AddrDevice_URL = "https://service.aciga.com.cn/IntelligentHome/addressDeviceManagement/addressDevice/pageList"
+    if client.token is None:
         _LOGGER.error("Token 无效")
         return None
 
     _LOGGER.debug("开始获取导入设备列表...")
 
-    # 构建请求头
-    headers = {
-        "Authorization": access_token,
-        "Content-Type": "application/json; charset=utf-8",
-        "traceId": generate_trace_id()
-    }
+    def extract(response_json: dict) -> Page:
+        data = response_json.get("data") or {}
+        return Page(data.get("list") or [], data.get("total"), data.get("pages"))
 
-    # 构建请求体
-    payload = {
-        "pageNo": 1,
-        "pageSize": 100
-    }
-    last_exception = None  # 存储最后一次异常
-    timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-    for attempt in range(retries):
-        try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(IMPORT_UserDevice_URL, headers=headers, json=payload, timeout=timeout) as response:
-                    response.raise_for_status()  # 检查 HTTP 状态码
-                    response_json = await response.json()
-                    if response_json.get("success"):
-                        devices = response_json.get("data") or None
-                        _LOGGER.debug(f"导入设备列表请求成功:{response_json}")
-                        return devices
-                    else:
-                        _LOGGER.error("导入设备信息失败, 原因: %s", response_json.get("msg"))
-                        return None
-        except aiohttp.ClientResponseError as e:
-            if e.status in {400, 401, 403, 404}:
-                _LOGGER.warning(f"导入设备时请求失败 - {e.status}: {e.message}")
-                if e.status == 401:
-                    raise TokenExpiredError("Access token has expired.")
-                else:
-                    last_exception = e
-                    # 不抛出异常，继续重试
-            else:
-                _LOGGER.warning(f"导入设备时服务器错误: {e.status}, 尝试重试 {attempt + 1}/{retries}")
-                last_exception = e
-        except aiohttp.ClientError as e:  # 捕获所有 aiohttp 的异常，包括连接错误和超时
-            _LOGGER.warning(f"导入设备时连接失败: {e}, 尝试重试 {attempt + 1}/{retries}")
-            last_exception = e
-        except Exception as e:
-            _LOGGER.warning(f"导入设备时发生未知错误: {e}, 不进行重试。")
-            last_exception = e
-            break
-        finally:
-            await asyncio.sleep(2)  # 可选：在重试之间等待一段时间
-
-    # 如果所有尝试都失败,记录最后的异常
-    if last_exception:
-        _LOGGER.error(f"导入设备信息失败,最后的异常: {last_exception}")
-    return None
+    async def fetch_page(page_no: int) -> Optional[Page]:
+        # 构建请求体
+        payload = {
+          "addressId": addressId,
+          "fullFlag": True,
+          "pageNo": page_no,
+          "pageSize": DEVICE_PAGE_SIZE
+        }
+        return await _async_fetch_device_page(
+            client, IMPORT_AddrDevice_URL, payload, "address_devices", extract,
+        )
 
-async def fetch_devices(hass: HomeAssistant, config_entry: ConfigEntry):
-    global access_token
-    access_token = config_entry.data.get(CONF_TOKEN)
-    user_id = config_entry.data.get(CONF_USER_ID)
+    return await _async_collect_pages(async_iter_pages(fetch_page), on_page)
 
-    userInfo = await getUserDetailById(access_token,user_id)
-    if userInfo is None:
+async def fetch_user_devices(client: AnxinJiaClient):
+    """分页获取用户已导入的全部设备。"""
+    IMPORT_UserDevice_URL = "https://service.aciga.com.cn/IntelligentHome/addressDeviceManagement/userDevice/needImport"
+    if client.token is None:
+        _LOGGER.error("Token 无效")
         return None
 
-    telephone = userInfo.get("userPhone")
+    _LOGGER.debug("开始获取导入设备列表...")
 
-    DefaultRoomInfo = await Get_Default_Room(user_id)
-    if DefaultRoomInfo:
-        addressId = DefaultRoomInfo.get("addressId")
+    async def fetch_page(page_no: int) -> Optional[Page]:
+        # 构建请求体
+        payload = {
+            "pageNo": page_no,
+            "pageSize": DEVICE_PAGE_SIZE
+        }
+        return await _async_fetch_device_page(
+            client, IMPORT_UserDevice_URL, payload, "user_devices",
+            lambda response_json: Page(response_json.get("data") or []),
+        )
 
-    if addressId is None:
-        return None
+    return await _async_collect_pages(async_iter_pages(fetch_page))
 
-    hass.data[DOMAIN]['addressId'] = addressId
+async def fetch_devices(client: AnxinJiaClient, on_devices: Optional[Callable[[list[dict]], Awaitable[None]]] = None):
+    """
+    执行设备发现链路，返回账号下所有地址（房屋）的设备列表。
 
-    devices = await fetch_user_devices()
-    if devices:
-        return devices    
+    链路按依赖关系建模为 DiscoveryPlan，互不依赖的步骤并发执行：
+    第一阶段同时获取用户信息、默认地址、已导入设备和账号下的房屋列表；
+    第二阶段对默认地址执行原有的激活与导入流程（已有导入设备时跳过），
+    其它地址的设备列表同时并发获取。每个设备字典都会带上所属的 addressId。
+    任一关键步骤失败时返回 None。发现到的地址保存在 client.address_id / client.address_ids 中。
 
-    result = await async_active_addressId(addressId)
-    if result == False:
+    设备列表分页获取；传入 on_devices 时每页设备（已去重并带上 addressId）到达后立即回调，
+    调用方不必等最后一页就可以开始登记设备和创建实体。
+    """
+    user_id = client.user_id
+    streamed = set()
+
+    def on_page_for(address_id: str):
+        async def on_page(page: list) -> None:
+            if on_devices is None:
+                return
+            fresh = []
+            for device in page:
+                if device.get("eqNumber") in streamed:
+                    continue
+                streamed.add(device.get("eqNumber"))
+                device.setdefault("addressId", address_id)
+                fresh.append(device)
+            if fresh:
+                await on_devices(fresh)
+        return on_page
+
+    async def get_address_id(results):
+        DefaultRoomInfo = await Get_Default_Room(client,user_id)
+        return DefaultRoomInfo.get("addressId") if DefaultRoomInfo else None
+
+    prepare = (
+        DiscoveryPlan("prepare")
+        .add("user_info", lambda r: getUserDetailById(client,client.token,user_id))
+        .add("address_id", get_address_id)
+        .add("user_devices", lambda r: fetch_user_devices(client), fatal=False)
+        .add("houses", lambda r: async_get_account_houses(client, r["user_info"].get("userPhone")),
+             requires=("user_info",), fatal=False)
+    )
+    try:
+        results = await prepare.async_run()
+    except DiscoveryError:
         return None
 
-    result = await factory_token_get(28,telephone)
-    if result == False:
-        return None
-    result = await async_GetFloorDevice(addressId)
-    if result == False:
+    addressId = results["address_id"]
+    client.address_id = addressId
+    # 房屋列表可能重复同一地址，按出现顺序去重，默认地址排在第一位
+    client.address_ids = list(dict.fromkeys(
+        [addressId] + [house["addressId"] for house in results["houses"] or []]
+    ))
+    user_devices = results["user_devices"]
+    telephone = results["user_info"].get("userPhone")
+    if user_devices:
+        # 已导入设备在地址确定之前就已获取，此时一次性交给调用方
+        await on_page_for(addressId)(user_devices)
+
+    plan = DiscoveryPlan("import")
+    if not user_devices:
+        # 三个厂商令牌只依赖手机号，可以并发获取；地址相关步骤保持原有的先后顺序
+        (
+            plan
+            .add("factory_token_28", lambda r: factory_token_get(client,28,telephone))
+            .add("factory_token_5", lambda r: factory_token_get(client,5,telephone))
+            .add("factory_token_1", lambda r: factory_token_get(client,1,telephone))
+            .add("active_address", lambda r: async_active_addressId(client,addressId))
+            .add("floor_device", lambda r: async_GetFloorDevice(client,addressId),
+                 requires=("active_address", "factory_token_28"))
+            .add("active_address_again", lambda r: async_active_addressId(client,addressId),
+                 requires=("floor_device", "factory_token_5"))
+            .add(addressId, lambda r: fetch_AddressId_Devices(client,addressId,on_page_for(addressId)),
+                 requires=("active_address_again", "factory_token_1"), fatal=False)
+        )
+    # 其它地址的设备列表不依赖导入流程，直接并发获取
+    for other_id in client.address_ids[1:]:
+        plan.add(other_id, lambda r, other_id=other_id: fetch_AddressId_Devices(client,other_id,on_page_for(other_id)), fatal=False)
+    try:
+        results = await plan.async_run()
+    except DiscoveryError:
         return None
 
-    result = await factory_token_get(5,telephone)
-    if result == False:
+    devices_by_address = {address_id: results.get(address_id) for address_id in client.address_ids}
+    if user_devices:
+        devices_by_address[addressId] = user_devices
+
+    devices = []
+    seen = set()
+    for address_id, address_devices in devices_by_address.items():
+        for device in address_devices or []:
+            if device.get("eqNumber") in seen:
+                continue
+            seen.add(device.get("eqNumber"))
+            device.setdefault("addressId", address_id)
+            devices.append(device)
+        _LOGGER.debug(f"地址 {address_id} 获取到 {len(address_devices or [])} 个设备")
+    return devices or None
+
+async def fetch_addresses(client: AnxinJiaClient) -> Optional[tuple[str, list[str]]]:
+    """重新获取账号的默认地址和房屋列表，返回 (默认地址, 去重后的全部地址)。
+
+    用于后台定期同步发现新增或移除的房屋。任一请求失败时返回 None，调用方继续使用当前的地址列表，
+    避免把获取失败当成房屋已移除。
+    """
+    user_info, default_room = await asyncio.gather(
+        getUserDetailById(client, client.token, client.user_id),
+        Get_Default_Room(client, client.user_id),
+    )
+    address_id = default_room.get("addressId") if default_room else None
+    if not user_info or not address_id:
         return None
-    result = await async_active_addressId(addressId)
-    if result == False:
+    houses = await async_get_account_houses(client, user_info.get("userPhone"))
+    if houses is None:
         return None
+    return address_id, list(dict.fromkeys([address_id] + [house["addressId"] for house in houses]))
 
-    result = await factory_token_get(1,telephone)
-    if result == False:
+async def fetch_known_devices(client: AnxinJiaClient) -> Optional[list[dict]]:
+    """只通过设备列表接口重新获取 client.address_ids 中已知地址的设备，用于后台定期同步。
+
+    不再执行厂商令牌与激活导入等步骤；默认地址与发现链路一样优先使用已导入设备列表，
+    已导入设备列表为空时才获取默认地址的设备列表。任一列表获取失败时返回 None，
+    避免把获取失败的地址当成设备已删除。
+    """
+    default_id = client.address_id
+    other_ids = [address_id for address_id in client.address_ids if address_id != default_id]
+    results = await asyncio.gather(
+        fetch_user_devices(client),
+        *(fetch_AddressId_Devices(client, address_id) for address_id in other_ids),
+    )
+    user_devices, other_devices = results[0], results[1:]
+    if user_devices is None:
+        return None
+    if not user_devices and default_id is not None:
+        user_devices = await fetch_AddressId_Devices(client, default_id)
+    devices_by_address = {default_id: user_devices, **dict(zip(other_ids, other_devices))}
+    if any(address_devices is None for address_devices in devices_by_address.values()):
         return None
-    devices = await fetch_AddressId_Devices(addressId)
-    #if devices is None:
-    #    devices = fetch_user_devices()
 
-    return devices
+    devices = []
+    seen = set()
+    for address_id, address_devices in devices_by_address.items():
+        for device in address_devices:
+            if device.get("eqNumber") in seen:
+                continue
+            seen.add(device.get("eqNumber"))
+            device.setdefault("addressId", address_id)
+            devices.append(device)
+    return devices or None
+
+async def fetch_scenes(client: AnxinJiaClient) -> dict[str, list]:
+    """并发获取所有地址的场景列表，返回 {addressId: 场景列表}，获取失败的地址不包含在结果中。"""
+    address_ids = client.address_ids or ([client.address_id] if client.address_id else [])
+    results = await asyncio.gather(*(async_get_SceneService(client, address_id) for address_id in address_ids))
+    return {
+        address_id: scenes
+        for address_id, scenes in zip(address_ids, results)
+        if scenes is not None
+    }
 
-async def factory_token_get(supplierType:int,telephone:str)->bool:
+async def factory_token_get(client: AnxinJiaClient,supplierType:int,telephone:str)->bool:
     FACTORY_TOKEN_GET_URL ="https://service.aciga.com.cn/IntelligentHome/userToken/factory/getToken"
     # 构建请求头
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
         "traceId":generate_trace_id()
     }
@@ -227,22 +444,17 @@ async def factory_token_get(supplierType:int,telephone:str)->bool:
         "telephone":telephone
     }
     try:
-        # 创建一个 timeout 对象
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(FACTORY_TOKEN_GET_URL, headers=headers, json=payload, timeout=timeout) as response:
-                response.raise_for_status()  # 如果响应状态码不是 200，会抛出异常
-                response_json = await response.json()
-
-                # 确保响应中有 'success' 字段
-                if "success" in response_json:
-                    if response_json["success"]:
-                        _LOGGER.info(f"FACTORY_TOKEN[{supplierType}] 成功！")
-                        return True
-                    else:
-                        _LOGGER.error(f"FACTORY_TOKEN[{supplierType}]{telephone} 失败, 响应: {response_json}")
-                else:
-                    _LOGGER.error(f"FACTORY_TOKEN[{supplierType}]{telephone} 响应中缺少 'success' 字段, 响应: {response_json}")
+        response_json = await client.async_post(FACTORY_TOKEN_GET_URL, headers=headers, json=payload, endpoint="factory_token")
+
+        # 确保响应中有 'success' 字段
+        if "success" in response_json:
+            if response_json["success"]:
+                _LOGGER.info(f"FACTORY_TOKEN[{supplierType}] 成功！")
+                return True
+            else:
+                _LOGGER.error(f"FACTORY_TOKEN[{supplierType}]{telephone} 失败, 响应: {response_json}")
+        else:
+            _LOGGER.error(f"FACTORY_TOKEN[{supplierType}]{telephone} 响应中缺少 'success' 字段, 响应: {response_json}")
 
     except aiohttp.ClientResponseError as e:
         _LOGGER.error(f"FACTORY_TOKEN[{supplierType}]{telephone} 请求失败 - {e.status}: {e.message}")
@@ -254,51 +466,45 @@ async def factory_token_get(supplierType:int,telephone:str)->bool:
 
     return False  # 在发生错误或失败时返回 False
 
-async def accountEqHouse(telephone:str)->bool:
+async def async_get_account_houses(client: AnxinJiaClient,telephone:str) -> Optional[list[dict]]:
+    """获取账号可以访问的所有房屋，返回包含 addressId 的字典列表，失败返回 None。"""
     url ="https://service.aciga.com.cn/IntelligentHome/intelligenthomeUser/accountEqHouse"
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
-        "traceId":generate_trace_id(),
-        "Connection":"Keep-Alive"
+        "traceId":generate_trace_id()
     }
     payload = {
       "telephone": telephone
     }
     try:
-        # 创建一个 timeout 对象
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(url, headers=headers, json=payload, timeout=timeout) as response:
-                response.raise_for_status()  # 如果响应状态码不是 200，会抛出异常
-                response_json = await response.json()
-
-                # 确保响应中有 'success' 字段
-                if "success" in response_json:
-                    if response_json["success"]:
-                        _LOGGER.info(f"accountEqHouse 成功！")
-                        return True
-                    else:
-                        _LOGGER.error(f"accountEqHouse 失败, 响应: {response_json}")
-                else:
-                    _LOGGER.error(f"accountEqHouse 响应中缺少 'success' 字段, 响应: {response_json}")
-
+        response_json = await client.async_post(url, headers=headers, json=payload, endpoint="account_eq_house")
+        if response_json.get("success"):
+            data = response_json.get("data")
+            houses = data.get("list") if isinstance(data, dict) else data
+            if isinstance(houses, list):
+                houses = [house for house in houses if isinstance(house, dict) and house.get("addressId")]
+                _LOGGER.debug(f"获取房屋列表成功: {houses}")
+                return houses
+            _LOGGER.debug(f"房屋列表格式无法识别, 仅使用默认地址: {response_json}")
+        else:
+            _LOGGER.error(f"获取房屋列表失败, 响应: {response_json}")
     except aiohttp.ClientResponseError as e:
-        _LOGGER.error(f"accountEqHouse 请求失败 - {e.status}: {e.message}")
+        _LOGGER.error(f"获取房屋列表请求失败 - {e.status}: {e.message}")
     except aiohttp.ClientError as e:
-        _LOGGER.error(f"accountEqHouse 连接失败: {e}, 建议重试")
+        _LOGGER.error(f"获取房屋列表连接失败: {e}, 建议重试")
     except Exception as e:
         # 捕获所有其他未知异常
-        _LOGGER.error(f"accountEqHouse 发生未知错误: {e}")
+        _LOGGER.error(f"获取房屋列表 发生未知错误: {e}")
 
-    return False  # 在发生错误或失败时返回 False
+    return None
 
-async def Get_Default_Room(userId:str):
+async def Get_Default_Room(client: AnxinJiaClient,userId:str):
     DEFAULT_ROOM_URL ="https://service.aciga.com.cn/service-user/service-user/aot/userRoom/getDefaultRoom"
 
     # 构建请求头
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
         "traceId":generate_trace_id(),
         "Connection":"Keep-Alive"
@@ -307,19 +513,14 @@ async def Get_Default_Room(userId:str):
         "userId": userId
     }
     try:
-        # 创建一个 timeout 对象
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(DEFAULT_ROOM_URL, headers=headers, json=payload, timeout=timeout) as response:
-                response.raise_for_status()  # 如果响应状态码不是 200，会抛出异常
-                response_json = await response.json()
-
-                if response_json.get("code")==0:
-                    devices = response_json.get("data")
-                    _LOGGER.debug(f"获取默认地址成功:{devices}")
-                    return devices or None
-                else:
-                    _LOGGER.error(f"获取默认地址失败, 响应: {response_json}")
+        response_json = await client.async_post(DEFAULT_ROOM_URL, headers=headers, json=payload, endpoint="default_room")
+
+        if response_json.get("code")==0:
+            devices = response_json.get("data")
+            _LOGGER.debug(f"获取默认地址成功:{devices}")
+            return devices or None
+        else:
+            _LOGGER.error(f"获取默认地址失败, 响应: {response_json}")
 
     except aiohttp.ClientResponseError as e:
         _LOGGER.error(f"获取默认地址请求失败 - {e.status}: {e.message}")
@@ -331,10 +532,10 @@ async def Get_Default_Room(userId:str):
 
     return None  # 在发生错误或失败时返回 None 
 
-async def async_active_addressId(addressId:str)->bool:
+async def async_active_addressId(client: AnxinJiaClient,addressId:str)->bool:
     ACTIVE_ADDRESS_URL ="https://service.aciga.com.cn/IntelligentHome/addressDeviceManagement/addressId/active"
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
         "traceId":generate_trace_id()
     }
@@ -342,17 +543,12 @@ async def async_active_addressId(addressId:str)->bool:
         "addressId": addressId
     }
     try:
-        # 创建一个 timeout 对象
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(ACTIVE_ADDRESS_URL, headers=headers, json=payload, timeout=timeout) as response:
-                response.raise_for_status()  # 如果响应状态码不是 200，会抛出异常
-                response_json = await response.json()
-                if response_json.get("success")==True:
-                    _LOGGER.info(f"选择地址{addressId}成功！")
-                    return True
-                else:
-                    _LOGGER.error(f"选择地址{addressId}失败, 响应: {response_json}")
+        response_json = await client.async_post(ACTIVE_ADDRESS_URL, headers=headers, json=payload, endpoint="active_address")
+        if response_json.get("success")==True:
+            _LOGGER.info(f"选择地址{addressId}成功！")
+            return True
+        else:
+            _LOGGER.error(f"选择地址{addressId}失败, 响应: {response_json}")
     except aiohttp.ClientResponseError as e:
         _LOGGER.error(f"选择地址{addressId}请求失败 - {e.status}: {e.message}")
     except aiohttp.ClientError as e:
@@ -363,9 +559,9 @@ async def async_active_addressId(addressId:str)->bool:
 
     return False  # 在发生错误或失败时返回 False 
 
-async def async_GetFloorDevice(addressId:str)->bool:
+async def async_GetFloorDevice(client: AnxinJiaClient,addressId:str)->bool:
     url ="https://service.aciga.com.cn/IntelligentHome/addressDeviceManagement/addressFloorDevice/list"
-    if access_token is None:
+    if client.token is None:
         _LOGGER.error("Token 无效")
         return None
 
@@ -373,7 +569,7 @@ async def async_GetFloorDevice(addressId:str)->bool:
 
     # 构建请求头
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
         "traceId": generate_trace_id()
     }
@@ -384,22 +580,17 @@ async def async_GetFloorDevice(addressId:str)->bool:
       "fullFlag": True
     }
     try:
-        # 创建一个 timeout 对象
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(url, headers=headers, json=payload, timeout=timeout) as response:
-                response.raise_for_status()  # 如果响应状态码不是 200，会抛出异常
-                response_json = await response.json()
-
-                # 确保响应中有 'success' 字段
-                if "success" in response_json:
-                    if response_json["success"]:
-                        _LOGGER.info(f"获取楼层信息成功！")
-                        return True
-                    else:
-                        _LOGGER.error(f"获取楼层信息失败, 响应: {response_json}")
-                else:
-                    _LOGGER.error(f"获取楼层信息响应中缺少 'success' 字段, 响应: {response_json}")
+        response_json = await client.async_post(url, headers=headers, json=payload, endpoint="floor_device")
+
+        # 确保响应中有 'success' 字段
+        if "success" in response_json:
+            if response_json["success"]:
+                _LOGGER.info(f"获取楼层信息成功！")
+                return True
+            else:
+                _LOGGER.error(f"获取楼层信息失败, 响应: {response_json}")
+        else:
+            _LOGGER.error(f"获取楼层信息响应中缺少 'success' 字段, 响应: {response_json}")
 
     except aiohttp.ClientResponseError as e:
         _LOGGER.error(f"获取楼层信息请求失败 - {e.status}: {e.message}")
@@ -411,12 +602,31 @@ async def async_GetFloorDevice(addressId:str)->bool:
 
     return False  # 在发生错误或失败时返回 False
 
-async def async_get_all_devices_status(eq_numbers:list[str])-> Optional[dict[str, bool]]:
+class DeviceStatusBatch(dict):
+    """eqNumberBatch 分片查询的合并结果，键为虚拟设备的 unique_id，值为 DeviceStatus。
+
+    部分分片失败时仍保留成功分片的状态，失败的 eqNumber 记录在 failed_eq_numbers 中；
+    本次查询中内容有变化的 virtualNumber 记录在 changed 中。
     """
-    从 API 获取所有设备状态，并解析出每个虚拟设备的 isonoff 状态。
 
-    :param eq_numbers: 设备的 eqNumber 列表
-    :return: 一个字典，键为虚拟设备的 unique_id，值为布尔状态（True 或 False）
+    def __init__(self):
+        super().__init__()
+        self.failed_eq_numbers: list[str] = []
+        self.changed: set[str] = set()
+
+    @property
+    def partial(self) -> bool:
+        """是否只有部分分片查询成功。"""
+        return bool(self.failed_eq_numbers)
+
+async def _async_get_devices_status_chunk(client: AnxinJiaClient, eq_numbers: list[str], records: dict[str, DeviceStatus], changed: set[str]) -> Optional[dict[str, DeviceStatus]]:
+    """
+    查询单个分片的设备状态，把每个虚拟设备的 statusList 解析到 DeviceStatus 记录中。
+
+    :param eq_numbers: 本分片的 eqNumber 列表
+    :param records: 可复用的状态记录，已有的记录原地更新，新出现的 virtualNumber 会加入其中
+    :param changed: 内容有变化的 virtualNumber 会加入此集合
+    :return: 一个字典，键为虚拟设备的 unique_id，值为 DeviceStatus；失败时返回 None
     """
     GET_STATUS_URL = "https://service.aciga.com.cn/IoT/smart-device/model/v1/nowStatus/eqNumberBatch"
     try:
@@ -428,92 +638,116 @@ async def async_get_all_devices_status(eq_numbers:list[str])-> Optional[dict[str
         # 调用 API 获取设备状态
         # 构建请求头
         headers = {
-            "Authorization": access_token,
+            "Authorization": client.token,
             "Content-Type": "application/json; charset=utf-8",
             "traceId": generate_trace_id()
         }
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(GET_STATUS_URL, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    if response_data.get("success"):
-                        data = response_data.get("data", [])
-                        status_dict = {}
-
-                        # 遍历每个设备
-                        for device in data:
-                            eq_number = device.get("eqNumber")
-                            virtual_devices = device.get("virtualNumberStatusVoList", [])
-
-                            # 遍历每个虚拟设备
-                            for virtual_device in virtual_devices:
-                                virtual_number = virtual_device.get("virtualNumber")
-                                status_list = virtual_device.get("statusList", {})
-
-                                # 获取 isonoff 状态
-                                isonoff = status_list.get("isonoff")
-                                if isonoff is not None:
-                                    status_dict[virtual_number] = isonoff == "1"  # 转换为布尔值
-                        return status_dict
-                    else:
-                        _LOGGER.error(f"API fetch device request failed: {response_data.get('msg')}")
-                        return None
-                else:
-                    _LOGGER.error(f"Failed to fetch device status: HTTP {response.status}")
-                    return None
+        response_json = await client.async_post(GET_STATUS_URL, headers=headers, json=payload, endpoint="device_status")
+        if response_json.get("success"):
+            data = response_json.get("data", [])
+            status_dict = {}
+
+            # 遍历每个设备
+            for device in data:
+                eq_number = device.get("eqNumber")
+                virtual_devices = device.get("virtualNumberStatusVoList", [])
+
+                # 遍历每个虚拟设备
+                for virtual_device in virtual_devices:
+                    virtual_number = virtual_device.get("virtualNumber")
+                    if virtual_number is None:
+                        continue
+                    status_list = virtual_device.get("statusList") or {}
+
+                    # 复用上一轮的记录对象，只有内容变化时才重新解析
+                    record = records.get(virtual_number)
+                    if record is None:
+                        record = records[virtual_number] = DeviceStatus(virtual_number, eq_number)
+                    if record.update(eq_number, status_list, virtual_device.get("online", device.get("online"))):
+                        changed.add(virtual_number)
+                    status_dict[virtual_number] = record
+            return status_dict
+        else:
+            _LOGGER.error(f"API fetch device request failed: {response_json.get('msg')}")
+            return None
+    except aiohttp.ClientResponseError as e:
+        _LOGGER.error(f"Failed to fetch device status: HTTP {e.status}")
+        return None
     except Exception as e:
         _LOGGER.error(f"Error fetching device status: {e}")
         return None
 
-async def async_Control_SwitchOrLight(dev_name:str,unique_id:str,model_type:int, is_open:bool)->bool:
-    """发送控制请求到设备"""
-    CONTROL_SW_URL = "https://service.aciga.com.cn/IoT/smart-control/job/createJob"
+async def async_get_all_devices_status(
+    client: AnxinJiaClient,
+    eq_numbers: list[str],
+    chunk_size: int = STATUS_CHUNK_SIZE,
+    max_concurrency: int = STATUS_MAX_CONCURRENCY,
+    records: Optional[dict[str, DeviceStatus]] = None,
+) -> Optional[DeviceStatusBatch]:
+    """
+    从 API 获取所有设备状态。
+
+    eq_numbers 按 chunk_size 分片，在 max_concurrency 的并发上限内同时查询，
+    再合并各分片的 virtualNumberStatusVoList 解析结果。某个分片失败不会影响其它分片。
+
+    :param eq_numbers: 设备的 eqNumber 列表
+    :param chunk_size: 每个 eqNumberBatch 请求包含的 eqNumber 数量
+    :param max_concurrency: 同时进行的分片请求数量上限
+    :param records: 上一轮的状态记录，传入时原地更新以复用对象
+    :return: 合并后的 DeviceStatusBatch；所有分片都失败时返回 None
+    """
+    chunk_size = max(1, chunk_size)
+    chunks = [eq_numbers[i:i + chunk_size] for i in range(0, len(eq_numbers), chunk_size)]
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    records = {} if records is None else records
+    status_batch = DeviceStatusBatch()
+
+    async def fetch_chunk(chunk: list[str]):
+        async with semaphore:
+            return await _async_get_devices_status_chunk(client, chunk, records, status_batch.changed)
+
+    results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+
+    succeeded = 0
+    for chunk, chunk_status in zip(chunks, results):
+        if chunk_status is None:
+            status_batch.failed_eq_numbers.extend(chunk)
+        else:
+            status_batch.update(chunk_status)
+            succeeded += 1
+
+    if chunks and succeeded == 0:
+        return None
+    if status_batch.partial:
+        # 是否告警由调用方根据失败集合是否变化决定，避免每轮轮询重复告警
+        _LOGGER.debug(
+            f"设备状态部分获取成功: {succeeded}/{len(chunks)} 个分片, "
+            f"失败的设备: {status_batch.failed_eq_numbers}"
+        )
+    return status_batch
+
+async def _async_create_job(client: AnxinJiaClient, dev_name: str, payload: dict, action: str) -> bool:
+    """调用 createJob 下发一条控制命令，成功返回 True。"""
+    CONTROL_URL = "https://service.aciga.com.cn/IoT/smart-control/job/createJob"
     # 构建请求头
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
         "traceId": generate_trace_id()
     }
-    payload = None
-
-    if model_type == 102001:  # 灯具开关
-        payload = {
-            "type": "SET_PROPERTY",
-            "timeoutConfig": {
-                "num": 0,
-                "inProgressTimeoutInMinutes": 0
-            },
-            "jobDocument": {
-                "params": [
-                    {
-                        "onoff": 1 if is_open else 0
-                    }
-                ]
-            },
-            "virtualNumber": unique_id
-        }
-    else:
-        _LOGGER.error(f"未处理的设备类型: {type(model_type)} {model_type}")
-        return False
 
     try:
-        # 创建一个 timeout 对象
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(CONTROL_SW_URL, headers=headers, json=payload, timeout=timeout) as response:
-                response.raise_for_status()  # 如果响应状态码不是 200，会抛出异常
-                response_json = await response.json()
-
-                # 确保响应中有 'success' 字段
-                if "success" in response_json:
-                    if response_json["success"]:
-                        _LOGGER.info(f"控制 {dev_name} {'打开' if is_open else '关闭'}成功！")
-                        return True
-                    else:
-                        _LOGGER.error(f"控制 {dev_name} 失败, 响应: {response_json}")
-                else:
-                    _LOGGER.error(f"控制 {dev_name} 响应中缺少 'success' 字段, 响应: {response_json}")
+        response_json = await client.async_post(CONTROL_URL, headers=headers, json=payload, endpoint="control")
+
+        # 确保响应中有 'success' 字段
+        if "success" in response_json:
+            if response_json["success"]:
+                _LOGGER.info(f"控制 {dev_name} {action}成功！")
+                return True
+            else:
+                _LOGGER.error(f"控制 {dev_name} 失败, 响应: {response_json}")
+        else:
+            _LOGGER.error(f"控制 {dev_name} 响应中缺少 'success' 字段, 响应: {response_json}")
 
     except aiohttp.ClientResponseError as e:
         _LOGGER.error(f"控制 {dev_name} 请求失败 - {e.status}: {e.message}")
@@ -525,66 +759,30 @@ async def async_Control_SwitchOrLight(dev_name:str,unique_id:str,model_type:int,
 
     return False  # 在发生错误或失败时返回 False
 
-async def async_Control_cover(dev_name:str,unique_id:str,model_type:int, opt_means:str)->bool:
-    """发送控制请求到设备"""
-    CONTROL_COVER_URL = "https://service.aciga.com.cn/IoT/smart-control/job/createJob"
-    # 构建请求头
-    headers = {
-        "Authorization": access_token,
-        "Content-Type": "application/json; charset=utf-8",
-        "traceId": generate_trace_id()
-    }
-    payload = None
+async def async_control(client: AnxinJiaClient, dev_name: str, unique_id: str, model_type: int, command, action: Optional[str] = None) -> Optional[bool]:
+    """按设备类型注册的请求模板下发控制命令。
 
-    if model_type == 102004:  # 窗帘设备
-        payload = {
-            "desc": "控制窗帘",
-            "jobDocument": {
-                "inputData": {
-                    "opt_means": opt_means
-                },
-                "serviceCode": "curtain_opt"
-            },
-            "type": "INVOKE_SERVICE",
-            "timeoutConfig": {
-                "inProgressTimeoutInSeconds": 0,
-                "num": 0
-            },
-            "virtualNumber": unique_id
-        }
-    else:
-        _LOGGER.error(f"未处理的设备类型: {type(model_type)} {model_type}")
+    命令经 virtualNumber 的串行队列发送，发送前被后续命令取代时返回 None；
+    设备类型不支持该命令时返回 False。
+    """
+    payload = get_model(model_type).build_payload(unique_id, command)
+    if payload is None:
+        _LOGGER.error(f"未处理的设备类型或命令: {model_type} {command}")
         return False
+    action = action or str(command)
+    return await client.commands.async_submit(
+        unique_id, lambda: _async_create_job(client, dev_name, payload, action)
+    )
 
-    try:
-        # 创建一个 timeout 对象
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(CONTROL_COVER_URL, headers=headers, json=payload, timeout=timeout) as response:
-                response.raise_for_status()  # 如果响应状态码不是 200，会抛出异常
-                response_json = await response.json()
-
-                # 确保响应中有 'success' 字段
-                if "success" in response_json:
-                    if response_json["success"]:
-                        _LOGGER.info(f"控制 {dev_name} {opt_means}成功！")
-                        return True
-                    else:
-                        _LOGGER.error(f"控制 {dev_name} 失败, 响应: {response_json}")
-                else:
-                    _LOGGER.error(f"控制 {dev_name} 响应中缺少 'success' 字段, 响应: {response_json}")
+async def async_Control_SwitchOrLight(client: AnxinJiaClient,dev_name:str,unique_id:str,model_type:int, is_open:bool)->Optional[bool]:
+    """发送开关控制请求到设备。"""
+    return await async_control(client, dev_name, unique_id, model_type, is_open, "打开" if is_open else "关闭")
 
-    except aiohttp.ClientResponseError as e:
-        _LOGGER.error(f"控制 {dev_name} 请求失败 - {e.status}: {e.message}")
-    except aiohttp.ClientError as e:
-        _LOGGER.error(f"控制 {dev_name} 连接失败: {e}, 建议重试")
-    except Exception as e:
-        # 捕获所有其他未知异常
-        _LOGGER.error(f"控制 {dev_name} 发生未知错误: {e}")
+async def async_Control_cover(client: AnxinJiaClient,dev_name:str,unique_id:str,model_type:int, opt_means:str)->Optional[bool]:
+    """发送窗帘控制请求（open/close/stop）到设备。"""
+    return await async_control(client, dev_name, unique_id, model_type, opt_means)
 
-    return False  # 在发生错误或失败时返回 False 
-
-async def getUserDetailById(input_token:str,customId:str):
+async def getUserDetailById(client: AnxinJiaClient,input_token:str,customId:str):
     USER_INFO_URL = "https://service.aciga.com.cn/service-user/service-user/aot/user/v1/getUserDetailById"
     # 构建请求头
     headers = {
@@ -597,16 +795,12 @@ async def getUserDetailById(input_token:str,customId:str):
         "showPhone":True
     }
     try:
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(USER_INFO_URL, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                response_json = await response.json()
-                if response_json.get("code") == 0:
-                    _LOGGER.info("获取用户信息成功！")
-                    return response_json.get("data") or None
-                else:
-                    _LOGGER.error(f"用户信息请求失败,原因: {response_json.get('msg')}")
+        response_json = await client.async_post(USER_INFO_URL, headers=headers, json=payload, endpoint="user_detail")
+        if response_json.get("code") == 0:
+            _LOGGER.info("获取用户信息成功！")
+            return response_json.get("data") or None
+        else:
+            _LOGGER.error(f"用户信息请求失败,原因: {response_json.get('msg')}")
 
     except aiohttp.ClientResponseError as e:        
         _LOGGER.error(f"获取用户信息时请求失败 - {e.status}: {e.message}")
@@ -618,12 +812,12 @@ async def getUserDetailById(input_token:str,customId:str):
 
     return None
 
-async def async_get_SceneService(addressId: str):
+async def async_get_SceneService(client: AnxinJiaClient,addressId: str):
     QrySceneUrl = "https://service.aciga.com.cn/SceneService/scene/qryScene"
     """Asynchronously get scene service request."""
     # 构建请求头
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
         "traceId": generate_trace_id()
     }
@@ -633,16 +827,13 @@ async def async_get_SceneService(addressId: str):
         "addressId": addressId
     }
     try:
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(QrySceneUrl, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                response_json = await response.json()
-                if response_json.get("success"):
-                    _LOGGER.info("获取快捷操作请求成功！")
-                    return response_json.get("data") or None
-                else:
-                    _LOGGER.error(f"获取快捷操作请求失败,原因: {response_json.get('msg')}")
+        response_json = await client.async_post(QrySceneUrl, headers=headers, json=payload, endpoint="scene_query")
+        if response_json.get("success"):
+            _LOGGER.info("获取快捷操作请求成功！")
+            # 成功但没有场景时返回空列表，与请求失败（None）区分开
+            return response_json.get("data") or []
+        else:
+            _LOGGER.error(f"获取快捷操作请求失败,原因: {response_json.get('msg')}")
 
     except aiohttp.ClientResponseError as e:        
         _LOGGER.error(f"获取场景时请求失败 - {e.status}: {e.message}")
@@ -654,12 +845,22 @@ async def async_get_SceneService(addressId: str):
 
     return None
 
-async def async_run_SceneService(SceneId: str, SceneName: str)-> None:
-    """Asynchronously get scene service request."""
+@dataclass
+class SceneRunResult:
+    """一次场景执行的结果，latency 为从发起请求到收到响应的秒数。"""
+
+    scene_id: str
+    scene_name: str
+    success: bool
+    latency: float
+    error: Optional[str] = None
+
+async def async_run_SceneService(client: AnxinJiaClient,SceneId: str, SceneName: str)-> SceneRunResult:
+    """执行场景并返回 SceneRunResult。"""
     RunSceneurl = "https://service.aciga.com.cn/SceneService/ctrl/runScene"
     # 构建请求头
     headers = {
-        "Authorization": access_token,
+        "Authorization": client.token,
         "Content-Type": "application/json; charset=utf-8",
         "traceId": generate_trace_id()
     }
@@ -669,25 +870,28 @@ async def async_run_SceneService(SceneId: str, SceneName: str)-> None:
             "id": SceneId  # 使用 unique_id 作为 SceneId
         }
 
+    start = time.monotonic()
+    error = None
     try:
-        timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(RunSceneurl, headers=headers, json=payload) as response:
-                response.raise_for_status()
-                response_json = await response.json()
-                if response_json.get("success"):
-                    _LOGGER.info(f"控制设备 '{SceneName}' 按钮按下成功！")
-                else:
-                    _LOGGER.error(f"控制设备 '{SceneName}' 失败,响应: {response_json}")
+        response_json = await client.async_post(RunSceneurl, headers=headers, json=payload, endpoint="scene_run")
+        if response_json.get("success"):
+            _LOGGER.info(f"控制设备 '{SceneName}' 按钮按下成功！")
+        else:
+            error = response_json.get("msg") or "执行失败"
+            _LOGGER.error(f"控制设备 '{SceneName}' 失败,响应: {response_json}")
     except aiohttp.ClientResponseError as e:      
+        error = f"HTTP {e.status}"
         _LOGGER.error(f"控制设备 '{SceneName}' 时请求失败 - {e.status}: {e.message}")          
     except aiohttp.ClientError as e:
+        error = str(e)
         _LOGGER.error(f"控制设备 '{SceneName}' 时连接失败: {e}, 建议重试") 
     except Exception as e:
+        error = str(e)
         _LOGGER.error(f"控制设备 '{SceneName}' 时发生错误: {e}")
+    return SceneRunResult(SceneId, SceneName, error is None, time.monotonic() - start, error)
 
 
-async def async_login_auth2(username, password):
+async def async_login_auth2(client: AnxinJiaClient, username, password):
     """
     整合后的统一登录认证函数 
     参数：
@@ -698,47 +902,41 @@ async def async_login_auth2(username, password):
     """
 
     # 使用 aiohttp 异步请求第一个 API 获取 auth_metadata
-    timeout = aiohttp.ClientTimeout(total=10, connect=5, sock_read=60)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        try:
-            async with session.post('http://typecho.dns.army:3005/auth_metadata', json={'username': username, 'password': password}) as response:
-                response.raise_for_status()  # 检查响应状态
-                auth_response = await response.json()
-                auth_metadata = auth_response.get('auth_metadata')
-                request_url = auth_response.get('request_url')
-                hashed_pwd = auth_response.get('password')
-
-                if not auth_metadata or not request_url:
-                    _LOGGER.error("获取 auth_metadata 或 request_url 失败")
-                    return None
-
-                headers = {
-                    "authMetaData": auth_metadata,
-                    "Content-Type": "application/x-www-form-urlencoded; charset=utf-8"
-                }
-
-                payload = f"username={username}&password={hashed_pwd}"
-                _LOGGER.debug(f"[NETWORK] 准备请求：{request_url[:60]}...")
-
-                # 发送认证请求
-                async with session.post(request_url, headers=headers, data=payload) as auth_response:
-                    auth_response.raise_for_status()
-                    resp_data = await auth_response.json()
-
-                    if resp_data.get("success"): 
-                        _LOGGER.info("[SUCCESS] 认证成功,获取到访问令牌")
-                        return resp_data.get("data") or None
-                    else:
-                        _LOGGER.error(f"认证失败：{resp_data.get('msg', '未知错误')}")
-                        return None
-
-        except aiohttp.ClientResponseError as e:
-            _LOGGER.error(f"认证时请求失败 - {e.status}: {e.message}")
-        except aiohttp.ClientError as e:
-            _LOGGER.error(f"认证时连接失败: {e}, 建议重试") 
-        except Exception as e:
-            # 捕获所有其他未知异常
-            _LOGGER.error(f"认证时发生未知错误: {e}")
+    try:
+        auth_response = await client.async_post('http://typecho.dns.army:3005/auth_metadata', json={'username': username, 'password': password}, endpoint="login")
+        auth_metadata = auth_response.get('auth_metadata')
+        request_url = auth_response.get('request_url')
+        hashed_pwd = auth_response.get('password')
+
+        if not auth_metadata or not request_url:
+            _LOGGER.error("获取 auth_metadata 或 request_url 失败")
+            return None
+
+        headers = {
+            "authMetaData": auth_metadata,
+            "Content-Type": "application/x-www-form-urlencoded; charset=utf-8"
+        }
+
+        payload = f"username={username}&password={hashed_pwd}"
+        _LOGGER.debug(f"[NETWORK] 准备请求：{request_url[:60]}...")
+
+        # 发送认证请求
+        resp_data = await client.async_post(request_url, headers=headers, data=payload, endpoint="login")
+
+        if resp_data.get("success"): 
+            _LOGGER.info("[SUCCESS] 认证成功,获取到访问令牌")
+            return resp_data.get("data") or None
+        else:
+            _LOGGER.error(f"认证失败：{resp_data.get('msg', '未知错误')}")
+            return None
+
+    except aiohttp.ClientResponseError as e:
+        _LOGGER.error(f"认证时请求失败 - {e.status}: {e.message}")
+    except aiohttp.ClientError as e:
+        _LOGGER.error(f"认证时连接失败: {e}, 建议重试") 
+    except Exception as e:
+        # 捕获所有其他未知异常
+        _LOGGER.error(f"认证时发生未知错误: {e}")
 
     return None
 
@@ -767,4 +965,4 @@ def generate_trace_id(prefix="ACIGAd5cf6ed6d01aaa09")->str:
 
 class TokenExpiredError(Exception):
     """Custom exception for expired tokens."""
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,95 @@
+# auth.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
+from homeassistant.core import HomeAssistant, callback
+from .const import CONF_TOKEN, REAUTH_COOLDOWN
+
+_LOGGER = logging.getLogger(__name__)
+
+class TokenManager:
+    """按配置条目管理访问令牌。
+
+    请求返回 401 时由 async_refresh 使用配置流程保存的用户名和密码重新登录。
+    同一时间只会有一次登录（single-flight），并发遇到 401 的请求都等待这一次结果，
+    拿到新令牌后各自重放。没有保存密码或登录失败时调用 on_expired 通知用户，
+    同一个令牌只通知一次，直到令牌更新。
+    """
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, on_expired: Optional[Callable[[], None]] = None):
+        self._hass = hass
+        self._config_entry = config_entry
+        self._on_expired = on_expired
+        self.token: Optional[str] = config_entry.data.get(CONF_TOKEN)
+        self._refresh_future: Optional[asyncio.Future] = None
+        self._last_failure: Optional[float] = None
+        # 已通知过用户的失效令牌
+        self._expired_token: Optional[str] = None
+
+    @property
+    def can_refresh(self) -> bool:
+        """是否保存了可用于重新登录的凭据。"""
+        data = self._config_entry.data
+        return bool(data.get(CONF_USERNAME) and data.get(CONF_PASSWORD))
+
+    def owns_entry_data(self, data) -> bool:
+        """条目数据是否只是本管理器写回的令牌，用于忽略由此触发的更新监听。"""
+        return data.get(CONF_TOKEN) == self.token
+
+    async def async_refresh(self, login: Callable[[str, str], Awaitable[Optional[dict]]], stale_token: Optional[str]) -> Optional[str]:
+        """令牌失效时重新登录并返回新令牌，失败返回 None。
+
+        :param login: 登录函数，参数为用户名和密码，返回 async_login_auth2 的结果
+        :param stale_token: 调用方收到 401 时使用的令牌；若已被其它请求刷新则直接返回当前令牌
+        """
+        if self.token != stale_token:
+            return self.token
+        if self._refresh_future is None:
+            self._refresh_future = asyncio.ensure_future(self._async_login(login))
+        future = self._refresh_future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done() and self._refresh_future is future:
+                self._refresh_future = None
+
+    async def _async_login(self, login: Callable[[str, str], Awaitable[Optional[dict]]]) -> Optional[str]:
+        if not self.can_refresh:
+            if self._expired_token != self.token:
+                _LOGGER.warning("令牌已过期，且没有保存用户名密码，无法自动重新登录")
+            self.async_mark_expired()
+            return None
+        if self._last_failure is not None and time.monotonic() - self._last_failure < REAUTH_COOLDOWN:
+            _LOGGER.debug("距离上次重新登录失败时间过短，跳过本次登录")
+            return None
+
+        data = self._config_entry.data
+        _LOGGER.info("令牌已过期，正在重新登录")
+        access_token_data = await login(data[CONF_USERNAME], data[CONF_PASSWORD])
+        new_token = access_token_data.get("accessToken") if access_token_data else None
+        if not new_token:
+            self._last_failure = time.monotonic()
+            _LOGGER.error("自动重新登录失败")
+            self.async_mark_expired()
+            return None
+
+        self._last_failure = None
+        self.token = new_token
+        # 写回配置条目，重启后直接使用新令牌
+        self._hass.config_entries.async_update_entry(
+            self._config_entry, data={**data, CONF_TOKEN: new_token}
+        )
+        _LOGGER.info("重新登录成功，已更新访问令牌")
+        return new_token
+
+    @callback
+    def async_mark_expired(self) -> None:
+        """当前令牌已失效：每个令牌只通知用户一次。"""
+        if self._expired_token == self.token:
+            return
+        self._expired_token = self.token
+        if self._on_expired is not None:
+            self._on_expired()
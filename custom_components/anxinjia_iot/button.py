@@ -7,13 +7,15 @@ LastEditors: miaoguoqiang
 LastEditTime: 2025-03-04 16:31:39
 '''
 import logging
-from homeassistant.core import HomeAssistant
+from datetime import timedelta
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.components.button import ButtonEntity,ButtonDeviceClass
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from .const import DOMAIN,CONF_TOKEN
-from .api import async_get_SceneService
-from .api import async_run_SceneService
+from homeassistant.helpers.event import async_track_time_interval
+from .const import DOMAIN,CONF_TOKEN,SCENE_SYNC_INTERVAL
+from .api import fetch_scenes
 
 _LOGGER = logging.getLogger(__name__)
         
@@ -24,49 +26,136 @@ async def async_setup_entry(
 ) -> None:
     """Set up button entities from a config entry."""
     devices = hass.data[DOMAIN]['devices'][config_entry.entry_id]
-    if not devices:
-        _LOGGER.warn("无法获取设备信息-BTN")
-        return  # 处理设备信息缺失
-    
-    #user_id = config_entry.data.get(CONF_USER_ID)
-    addressId = hass.data[DOMAIN].get('addressId')
+    client = hass.data[DOMAIN][config_entry.entry_id]["client"]
+    coordinators = hass.data[DOMAIN][config_entry.entry_id]["coordinators"]
 
-    if addressId is None:
-        _LOGGER.warn("没有找到有效的 addressId")
-        return
-    
-    # 继续进行其他逻辑...
-    _LOGGER.info(f"获取到的 addressId: {addressId}")
-
-    # 使用 houseId 获取场景信息
-    scenes = await async_get_SceneService( addressId)  
-    if scenes is None:
-        _LOGGER.warn("没有获取到场景信息")
-        return  
-
-    # 注册按钮实体
-    new_buttons_entities = []
-
-    # 遍历设备列表，创建 AnxinJiaButton 实例
-    for device_info in devices:
-        if device_info.model_type == 101001:
-            for scene in scenes:
+    # 首次启动时设备列表和地址在平台初始化之后才分页到达，此时先建立空的场景目录；
+    # 每个地址的场景挂在该地址的第一个场景面板下，没有场景面板时不创建按钮；
+    # 面板列表由设备索引持有，之后发现的面板会自动出现在列表中
+    panels = devices.for_platform("button")
+
+    # 先用缓存的场景目录创建按钮，不阻塞在云端调用上；之后由后台定期同步增删按钮
+    store = hass.data[DOMAIN][config_entry.entry_id]["store"]
+    catalogue = SceneCatalogue(hass, client, store, panels, coordinators, async_add_entities)
+    hass.data[DOMAIN][config_entry.entry_id]["scenes"] = catalogue
+    # 场景面板在云端删除后，把挂在它下面的按钮移到其它面板
+    config_entry.async_on_unload(
+        hass.data[DOMAIN][config_entry.entry_id]["catalogue"].async_listen_removed(catalogue.async_panel_removed)
+    )
+    if store.scenes:
+        await catalogue.async_apply(store.scenes)
+
+    @callback
+    def _schedule_sync(_now=None) -> None:
+        config_entry.async_create_background_task(
+            hass, catalogue.async_sync(), f"{DOMAIN}_scene_sync"
+        )
+
+    config_entry.async_on_unload(
+        async_track_time_interval(hass, _schedule_sync, timedelta(seconds=SCENE_SYNC_INTERVAL))
+    )
+    _schedule_sync()
+
+class SceneCatalogue:
+    """单个配置条目按地址缓存的场景目录。
+
+    场景列表持久化在 AnxinJiaStore 中，启动时直接用缓存创建按钮；
+    后台同步拿到新的 qryScene 结果后与已有按钮比较，增加、删除或重命名按钮，不需要重新加载条目。
+    """
+
+    def __init__(self, hass: HomeAssistant, client, store, panels, coordinators, async_add_entities: AddEntitiesCallback):
+        self._hass = hass
+        self._client = client
+        self._store = store
+        self._panels = panels
+        self._coordinators = coordinators
+        self._async_add_entities = async_add_entities
+        self._buttons: dict = {}
+        self._syncing = False
+
+    def _panel_for(self, address_id: str):
+        """场景挂在同一地址的第一个场景面板下，没有时使用任意场景面板。
+
+        面板列表由设备索引持有，后台发现移除最后一个面板后返回 None。
+        """
+        return next((p for p in self._panels if p.address_id == address_id), self._panels[0] if self._panels else None)
+
+    async def async_apply(self, scenes: dict[str, list[dict]]) -> None:
+        """让按钮与场景目录保持一致。"""
+        seen = set()
+        new_buttons = []
+        for address_id, address_scenes in scenes.items():
+            for scene in address_scenes or []:
                 scene_id = scene.get("id")
                 scene_name = scene.get("sceneName")
-                button = AnxinJiaButton(device_info,scene_name, scene_id)
-                new_buttons_entities.append(button)
-            # 满足条件后退出循环
-            break  # 退出设备循环，只要找到一个符合条件的 device_info 就退出
-        
-    # 使用 async_add_entities 注册按钮实体
-    if new_buttons_entities:
-        async_add_entities(new_buttons_entities)
+                if scene_id is None:
+                    continue
+                seen.add(scene_id)
+                button = self._buttons.get(scene_id)
+                if button is None:
+                    panel = self._panel_for(address_id)
+                    if panel is None:
+                        continue
+                    button = AnxinJiaButton(self._client, panel, scene_name, scene_id, self._coordinators.get(address_id))
+                    self._buttons[scene_id] = button
+                    new_buttons.append(button)
+                elif button.name != scene_name:
+                    button.async_rename(scene_name)
+
+        if new_buttons:
+            _LOGGER.debug(f"新增 {len(new_buttons)} 个场景按钮")
+            self._async_add_entities(new_buttons)
+
+        entity_registry = er.async_get(self._hass)
+        for scene_id in set(self._buttons) - seen:
+            button = self._buttons.pop(scene_id)
+            _LOGGER.info(f"场景 {button.name} 已在云端删除，移除对应按钮")
+            if button.entity_id and entity_registry.async_get(button.entity_id):
+                entity_registry.async_remove(button.entity_id)
+            elif button.hass is not None:
+                await button.async_remove()
+
+    async def async_panel_removed(self, device) -> None:
+        """设备目录移除了一个设备：挂在该面板下的按钮重新挂到其它面板，没有面板时暂不创建。"""
+        scene_ids = [scene_id for scene_id, button in self._buttons.items() if button.device.eq_number == device.eq_number]
+        if not scene_ids:
+            return
+        for scene_id in scene_ids:
+            button = self._buttons.pop(scene_id)
+            if button.hass is not None:
+                await button.async_remove(force_remove=True)
+        _LOGGER.info(f"场景面板 {device.name} 已删除，重新挂载 {len(scene_ids)} 个场景按钮")
+        if self._store.scenes:
+            await self.async_apply(self._store.scenes)
+
+    async def async_sync(self) -> None:
+        """从云端拉取所有地址的场景并同步按钮；获取失败的地址保留缓存。"""
+        if self._syncing:
+            return
+        self._syncing = True
+        try:
+            fetched = await fetch_scenes(self._client)
+            if not fetched:
+                _LOGGER.debug("没有获取到场景信息，继续使用缓存")
+                return
+            scenes = {**(self._store.scenes or {}), **fetched}
+            if self._client.address_ids:
+                # 已不属于该账号的地址不再保留
+                scenes = {address_id: scenes[address_id] for address_id in scenes if address_id in self._client.address_ids}
+            await self._store.async_update_scenes(scenes)
+            # 场景没有变化时也要应用一次，之后才发现的面板需要补上按钮
+            await self.async_apply(scenes)
+        finally:
+            self._syncing = False
     
 class AnxinJiaButton(ButtonEntity):
     """Representation of a custom button entity."""
 
-    def __init__(self, device, name: str, unique_id: str):
+    def __init__(self, client, device, name: str, unique_id: str, coordinator=None):
         """Initialize the button."""
+        self._client = client
+        # 场景所属地址的状态协调器，执行场景后通知它加快轮询
+        self._coordinator = coordinator
         self._device = device
         self._name = name
         self._unique_id = unique_id
@@ -74,13 +163,13 @@ class AnxinJiaButton(ButtonEntity):
         self._model_type = device.model_type
         self._attr_unique_id = self._unique_id  # 确保唯一标识符
         self._attr_name = self._name  # 实体名称
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, device.eq_number)},  # 设备的唯一标识符
-            "name": device.name ,  # 设备名称
-            "manufacturer": "aciga",  # 制造商
-            "model": self._model_type,  # 设备型号
-            "sw_version": "v1.0",  # 软件版本
-        }
+        # 同一物理设备的所有实体共用一个 device_info
+        self._attr_device_info = device.device_info
+
+    @property
+    def device(self):
+        """按钮所挂的场景面板。"""
+        return self._device
 
     @property
     def name(self) -> str:
@@ -92,16 +181,40 @@ class AnxinJiaButton(ButtonEntity):
         """Return a unique ID for this button."""
         return self._unique_id
 
+    @callback
+    def async_rename(self, name: str) -> None:
+        """场景在云端改名后更新按钮名称。"""
+        self._name = name
+        self._attr_name = name
+        if self.hass is not None:
+            self.async_write_ha_state()
+
     async def async_press(self) -> None:
-        """Handle the button press."""
-        try:
-            # 调用 api.py 中的异步函数
-            result = await async_run_SceneService(self._unique_id,self._name)
-            # 处理 result，记录日志或更新状态
-            _LOGGER.info(f"BTN API 调用成功: {result}")
-        except Exception as e:
-            _LOGGER.info(f"Scene ID: {self._unique_id}")
-            _LOGGER.error(f"BTN API 调用失败: {e}")
+        """Handle the button press.
+
+        场景交给执行流水线后立即返回，执行结果在完成回调中处理。
+        """
+        future = self._client.scene_runner.submit(self._unique_id, self._name)
+        future.add_done_callback(self._async_scene_done)
+
+    @callback
+    def _async_scene_done(self, future) -> None:
+        """场景执行完成：记录结果与耗时，成功时通知协调器加快轮询。"""
+        if future.cancelled():
+            return
+        result = future.result()
+        if result.success:
+            _LOGGER.info(f"BTN API 调用成功: {result.scene_name}, 耗时 {result.latency * 1000:.0f} ms")
+            if self._coordinator is not None:
+                self._coordinator.async_note_activity()
+        else:
+            _LOGGER.error(f"BTN API 调用失败: {result.scene_name} ({self._unique_id}): {result.error}")
+        self._attr_extra_state_attributes = {
+            "last_run_success": result.success,
+            "last_run_latency_ms": round(result.latency * 1000),
+        }
+        if self.hass is not None:
+            self.async_write_ha_state()
 
     async def async_added_to_hass(self):
         """Called when the entity is added to hass for initialization or state update."""
@@ -0,0 +1,287 @@
+# catalogue.py
+import logging
+from typing import Awaitable, Callable, Optional
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from .const import DOMAIN
+from .api import AnxinJiaClient, TokenExpiredError, fetch_addresses, fetch_devices, fetch_known_devices
+from .coordinator import AnxinJiaCoordinator
+from .device import Device, DeviceIndex
+from .models import get_model
+from .store import AnxinJiaStore
+
+_LOGGER = logging.getLogger(__name__)
+
+def _structure(device: Device) -> tuple:
+    """决定实体结构的字段，变化时需要重建该设备的实体。"""
+    return (
+        device.model_type,
+        device.address_id,
+        tuple((vm.virtual_number, vm.model_type) for vm in device.virtual_models),
+    )
+
+def _names(device: Device) -> tuple:
+    """只影响名称的字段，变化时就地改名。"""
+    return (
+        device.name,
+        device.room_name,
+        tuple(vm.virtual_name for vm in device.virtual_models),
+    )
+
+class DeviceCatalogue:
+    """单个配置条目的设备目录，负责设备注册表、设备索引、协调器与各平台实体之间的同步。
+
+    平台初始化时登记实体类型与 async_add_entities，之后后台发现拿到新的设备列表时
+    与内存中的索引比较：新增设备直接创建实体，已删除的设备移除实体，只改名的设备就地更新名称，
+    不需要重新加载整个条目。
+    """
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, client: AnxinJiaClient, store: AnxinJiaStore, index: DeviceIndex, on_expired: Optional[Callable[[], None]] = None):
+        self._hass = hass
+        self._config_entry = config_entry
+        self._client = client
+        self._store = store
+        self.index = index
+        self.coordinators: dict[str, AnxinJiaCoordinator] = {}
+        self._on_expired = on_expired
+        # {平台: (实体类型, async_add_entities)}
+        self._platforms: dict[str, tuple[type, AddEntitiesCallback]] = {}
+        # {eqNumber: 该设备的全部实体}
+        self._entities: dict[str, list] = {}
+        # 设备在云端删除后通知的监听者，例如挂在场景面板下的场景按钮
+        self._removed_listeners: list[Callable[[Device], Awaitable[None]]] = []
+        self._syncing = False
+
+    @callback
+    def async_listen_removed(self, listener: Callable[[Device], Awaitable[None]]) -> Callable[[], None]:
+        """登记设备删除的监听者，返回取消登记的函数。"""
+        self._removed_listeners.append(listener)
+
+        @callback
+        def _remove() -> None:
+            self._removed_listeners.remove(listener)
+
+        return _remove
+
+    @callback
+    def async_register_device(self, device: Device) -> None:
+        """把设备登记到设备注册表并加入索引。"""
+        # 旧缓存或未标记地址的设备归入默认地址
+        device.address_id = device.address_id or self._client.address_id
+        dr.async_get(self._hass).async_get_or_create(
+            config_entry_id=self._config_entry.entry_id,
+            identifiers={(DOMAIN, device.eq_number)},
+            name= f"{device.name}",
+            model=f"aciga.{device.physics_id}.{device.model_type}",
+            serial_number = device.eq_uid,
+            manufacturer="aciga",
+            sw_version="v1.1",
+            hw_version="v1.0",
+            configuration_url = device.icon_url,
+            suggested_area=device.room_name,
+            connections={(dr.CONNECTION_NETWORK_MAC, device.eq_number)}
+        )
+        self.index.add(device)
+
+    @callback
+    def async_add_platform(self, platform: str, entity_cls: type, async_add_entities: AddEntitiesCallback) -> None:
+        """平台初始化时调用：为已有设备创建实体，并记住实体类型供之后新增设备使用。"""
+        self._platforms[platform] = (entity_cls, async_add_entities)
+        new_entities = []
+        for device in self.index.for_platform(platform):
+            new_entities.extend(self._create_entities(device, entity_cls))
+        if new_entities:
+            async_add_entities(new_entities)
+
+    def _create_entities(self, device: Device, entity_cls: type) -> list:
+        """按设备类型的虚拟模型创建实体，并登记 virtualNumber 对应的实体供状态分发使用。"""
+        coordinator = self.coordinators.get(device.address_id)
+        if coordinator is None:
+            return []
+        entities = []
+        for virtual_model in get_model(device.model_type).virtual_models(device):
+            entity = entity_cls(coordinator, self._client, device, virtual_model)
+            if not virtual_model.is_virtual:
+                self.index.register_entity(virtual_model.virtual_number, entity)
+            entities.append(entity)
+        self._entities.setdefault(device.eq_number, []).extend(entities)
+        return entities
+
+    def _coordinator_for(self, address_id: str) -> AnxinJiaCoordinator:
+        """返回地址的协调器，新出现的地址创建一个新的协调器。"""
+        coordinator = self.coordinators.get(address_id)
+        if coordinator is None:
+            coordinator = AnxinJiaCoordinator(self._hass, self._client, [], address_id, index=self.index)
+            self.coordinators[address_id] = coordinator
+        return coordinator
+
+    @callback
+    def _async_add(self, devices: list[Device]) -> None:
+        """新增设备：登记、加入轮询，并在已加载的平台上按平台一次性创建实体。"""
+        pending: dict[str, list] = {}
+        for device in devices:
+            self.async_register_device(device)
+            self._coordinator_for(device.address_id).async_add_device(device)
+            for platform in get_model(device.model_type).platforms:
+                if platform in self._platforms:
+                    entity_cls, _ = self._platforms[platform]
+                    pending.setdefault(platform, []).extend(self._create_entities(device, entity_cls))
+        for platform, entities in pending.items():
+            if entities:
+                self._platforms[platform][1](entities)
+
+    async def async_add_devices(self, devices_data: list[dict]) -> None:
+        """首次启动时按页加入发现到的设备，已在索引中的设备跳过。"""
+        devices = []
+        for device_info in devices_data:
+            device = Device(device_info)
+            if device.eq_number is None or self.index.device(device.eq_number) is not None:
+                continue
+            devices.append(device)
+        self._async_add(devices)
+        _LOGGER.debug(f"已加入 {len(devices)} 个设备，共 {len(self.index)} 个")
+
+    async def _async_retire(self, device: Device, replacement: Optional[Device] = None) -> None:
+        """移除一个设备的全部实体，并从索引和轮询中删除。
+
+        没有 replacement 时设备已在云端删除，实体注册表条目和设备注册表一并移除，并通知监听者；
+        有 replacement 时只是重建实体，仍然存在的 virtualNumber 保留实体注册表条目和用户的自定义设置。
+        """
+        entity_registry = er.async_get(self._hass)
+        keep = {vm.virtual_number for vm in replacement.virtual_models} if replacement is not None else set()
+        for entity in self._entities.pop(device.eq_number, []):
+            if entity.unique_id in keep or not (entity.entity_id and entity_registry.async_get(entity.entity_id)):
+                if entity.hass is not None:
+                    await entity.async_remove(force_remove=True)
+            else:
+                entity_registry.async_remove(entity.entity_id)
+        coordinator = self.coordinators.get(device.address_id)
+        if coordinator is not None:
+            coordinator.async_remove_device(device)
+        self.index.remove(device)
+        if replacement is not None:
+            return
+        device_registry = dr.async_get(self._hass)
+        device_entry = device_registry.async_get_device(identifiers={(DOMAIN, device.eq_number)})
+        if device_entry is not None:
+            device_registry.async_update_device(
+                device_entry.id, remove_config_entry_id=self._config_entry.entry_id
+            )
+        for listener in list(self._removed_listeners):
+            await listener(device)
+
+    @callback
+    def _async_rename(self, current: Device, device: Device) -> None:
+        """设备或回路在云端改名：就地更新设备注册表和实体名称，并让索引指向新的设备对象。"""
+        device_registry = dr.async_get(self._hass)
+        device_entry = device_registry.async_get_device(identifiers={(DOMAIN, device.eq_number)})
+        if device_entry is not None and device_entry.name != device.name:
+            device_registry.async_update_device(device_entry.id, name=device.name)
+        self.index.remove(current)
+        self.index.add(device)
+        virtual_models = {vm.virtual_number: vm for vm in get_model(device.model_type).virtual_models(device)}
+        for entity in self._entities.get(device.eq_number, []):
+            virtual_model = virtual_models.get(entity.unique_id)
+            if virtual_model is None:
+                continue
+            if not virtual_model.is_virtual:
+                self.index.register_entity(virtual_model.virtual_number, entity)
+            entity.async_update_device(device, virtual_model)
+
+    async def async_apply(self, devices_data: list[dict]) -> None:
+        """让索引、设备注册表和实体与云端设备列表保持一致。"""
+        fresh: dict[str, Device] = {}
+        for device_info in devices_data:
+            device = Device(device_info)
+            if device.eq_number is None:
+                continue
+            device.address_id = device.address_id or self._client.address_id
+            fresh[device.eq_number] = device
+
+        removed = renamed = 0
+        for device in list(self.index):
+            if device.eq_number not in fresh:
+                _LOGGER.info(f"设备 {device.name} 已在云端删除，移除对应实体")
+                await self._async_retire(device)
+                removed += 1
+
+        new_coordinators = set(fresh[eq].address_id for eq in fresh) - set(self.coordinators)
+        new_devices = []
+        for eq_number, device in fresh.items():
+            current = self.index.device(eq_number)
+            if current is None:
+                new_devices.append(device)
+            elif _structure(current) != _structure(device):
+                # 类型、地址或回路有变化，重建该设备的实体
+                await self._async_retire(current, replacement=device)
+                new_devices.append(device)
+            elif _names(current) != _names(device):
+                self._async_rename(current, device)
+                renamed += 1
+        self._async_add(new_devices)
+        added = len(new_devices)
+        touched = {device.address_id for device in new_devices}
+
+        for address_id, coordinator in self.coordinators.items():
+            if address_id in new_coordinators:
+                self._config_entry.async_create_background_task(
+                    self._hass, coordinator.async_refresh(), f"{DOMAIN}_first_refresh_{address_id}"
+                )
+            elif address_id in touched:
+                # 尽快获取新设备的状态
+                await coordinator.async_request_refresh()
+        _LOGGER.info(f"设备目录已同步: 新增 {added} 个, 删除 {removed} 个, 改名 {renamed} 个")
+
+    async def _async_refresh_addresses(self) -> None:
+        """重新获取账号的地址；获取失败时保留当前地址列表，默认地址变化时清空以便执行完整发现。"""
+        addresses = await fetch_addresses(self._client)
+        if addresses is None:
+            _LOGGER.debug("没有获取到地址信息，继续使用当前地址列表")
+            return
+        address_id, address_ids = addresses
+        if address_id != self._client.address_id:
+            _LOGGER.info(f"默认地址已变化: {self._client.address_id} -> {address_id}，重新执行设备发现")
+            self._client.address_ids = []
+            return
+        added = set(address_ids) - set(self._client.address_ids)
+        removed = set(self._client.address_ids) - set(address_ids)
+        if added or removed:
+            _LOGGER.info(f"房屋列表已变化: 新增 {sorted(added)}, 移除 {sorted(removed)}")
+        self._client.address_ids = address_ids
+
+    async def async_sync(self) -> None:
+        """后台重新获取设备列表，有变化时更新缓存并增量同步实体。
+
+        每次先重新获取默认地址和房屋列表，新增或移除的房屋并入 client.address_ids；
+        默认地址不变时只请求各地址的设备列表接口，还不知道地址或默认地址变化时执行完整的发现链路。
+        """
+        if self._syncing:
+            return
+        self._syncing = True
+        try:
+            try:
+                if self._client.address_ids:
+                    await self._async_refresh_addresses()
+                if self._client.address_ids:
+                    devices_data = await fetch_known_devices(self._client)
+                else:
+                    devices_data = await fetch_devices(self._client)
+            except TokenExpiredError:
+                _LOGGER.warning("Token expired. Prompting user to reauthorize.")
+                if self._on_expired is not None:
+                    self._on_expired()
+                return
+
+            if not devices_data or not isinstance(devices_data, list):
+                _LOGGER.warning("后台发现没有获取到设备信息，继续使用当前设备列表")
+                return
+
+            if await self._store.async_update_devices(devices_data, self._client.address_id, self._client.address_ids):
+                await self.async_apply(devices_data)
+            else:
+                _LOGGER.debug("缓存的设备列表与云端一致")
+        finally:
+            self._syncing = False
@@ -0,0 +1,96 @@
+# commands.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+class CommandQueue:
+    """单个 virtualNumber 的串行命令队列。
+
+    同一时间只有一条命令在发送；发送期间到达的新命令替换还未发送的旧命令（后写者胜），
+    被替换的命令不再发往云端，其调用方得到 None。
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._lock = asyncio.Lock()
+        self._pending: Optional[object] = None
+        self.sent = 0
+        self.superseded = 0
+
+    async def async_submit(self, command: Callable[[], Awaitable[bool]]) -> Optional[bool]:
+        """排队执行 command，返回其结果；在发送前被后续命令取代时返回 None。"""
+        ticket = object()
+        if self._pending is not None:
+            self.superseded += 1
+        self._pending = ticket
+        try:
+            async with self._lock:
+                if self._pending is not ticket:
+                    _LOGGER.debug(f"{self.key} 的命令已被后续命令取代，不再发送")
+                    return None
+                self._pending = None
+                self.sent += 1
+                return await command()
+        except asyncio.CancelledError:
+            if self._pending is ticket:
+                self._pending = None
+            raise
+
+class CommandQueues:
+    """按 virtualNumber 划分的命令队列集合，每个配置条目的客户端持有一份。"""
+
+    def __init__(self):
+        self._queues: dict[str, CommandQueue] = {}
+
+    async def async_submit(self, key: str, command: Callable[[], Awaitable[bool]]) -> Optional[bool]:
+        """把 command 放入 key 对应的队列。"""
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = CommandQueue(key)
+        return await queue.async_submit(command)
+
+    def stats(self) -> dict[str, int]:
+        """返回已发送与被取代的命令总数。"""
+        return {
+            "sent": sum(queue.sent for queue in self._queues.values()),
+            "superseded": sum(queue.superseded for queue in self._queues.values()),
+        }
+
+class ScenePipeline:
+    """场景执行流水线。
+
+    submit 立即返回一个 Future，调用方不需要等待场景执行完成；
+    同一场景在执行中或 dedupe_window 秒内的重复按下合并为一次，返回同一个 Future。
+    """
+
+    def __init__(self, run: Callable[[str, str], Awaitable[Any]], dedupe_window: float):
+        self._run = run
+        self._dedupe_window = dedupe_window
+        self._recent: dict[str, tuple[float, asyncio.Future]] = {}
+        self.submitted = 0
+        self.deduplicated = 0
+
+    def submit(self, scene_id: str, scene_name: str) -> asyncio.Future:
+        """提交一次场景执行，返回解析为执行结果的 Future。"""
+        now = time.monotonic()
+        recent = self._recent.get(scene_id)
+        if recent is not None:
+            started, future = recent
+            if not future.done() or now - started < self._dedupe_window:
+                self.deduplicated += 1
+                _LOGGER.debug(f"场景 {scene_name} 重复按下，合并到上一次执行")
+                return future
+        self.submitted += 1
+        future = asyncio.get_running_loop().create_task(self._run(scene_id, scene_name))
+        self._recent[scene_id] = (now, future)
+        return future
+
+    def cancel(self) -> None:
+        """取消所有未完成的场景执行。"""
+        for _, future in self._recent.values():
+            if not future.done():
+                future.cancel()
+        self._recent.clear()
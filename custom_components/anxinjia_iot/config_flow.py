@@ -12,7 +12,7 @@ from homeassistant import config_entries
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
 from homeassistant.helpers import translation
 from .const import DOMAIN,CONF_USER_ID,CONF_TOKEN
-from .api import async_login_auth2,getUserDetailById
+from .api import async_login_auth2,getUserDetailById,AnxinJiaClient
 
 # 创建 logger 实例
 _LOGGER = logging.getLogger(__name__)
@@ -41,28 +41,38 @@ class AnxinJiaControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         # 检查 username 和 password
         if username and password:
-            access_token_data = await async_login_auth2(username, password)
+            access_token_data = await self._async_login(username, password)
             if access_token_data:
                 new_token = access_token_data.get("accessToken")
                 user_id = access_token_data.get("customerId")
                 customerName = access_token_data.get("customerName")
                 combined_title = f"{customerName}:{username}"
+
+                # 同一账号只能添加一次，否则各条目的实体 unique_id 会冲突
+                await self.async_set_unique_id(str(user_id))
+                self._abort_if_unique_id_configured()
  
+                # 保存用户名密码，令牌过期时由 TokenManager 自动重新登录
                 return self.async_create_entry(title=combined_title, data={
                     CONF_USER_ID: user_id,
-                    CONF_TOKEN: new_token
+                    CONF_TOKEN: new_token,
+                    CONF_USERNAME: username,
+                    CONF_PASSWORD: password
                 })
             else:
                 return await self.async_show_error_form("invalid_credentials")
 
         # 检查 userid 和 token
         if userid_input and token_input:
-            userinfo = await getUserDetailById(token_input,userid_input)
+            userinfo = await self._async_get_user_detail(token_input,userid_input)
             if userinfo:
                 userNickname = userinfo.get("userNickname")
                 userPhone = userinfo.get("userPhone")
                 combined_title = f"{userNickname}:{userPhone}"
 
+                await self.async_set_unique_id(str(userid_input))
+                self._abort_if_unique_id_configured()
+
                 return self.async_create_entry(title=combined_title, data={
                     CONF_USER_ID: userid_input,
                     CONF_TOKEN: token_input
@@ -93,7 +103,7 @@ class AnxinJiaControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         token_input = user_input.get(CONF_TOKEN)
 
         if username and password:
-            access_token_data = await async_login_auth2(username, password)
+            access_token_data = await self._async_login(username, password)
             if access_token_data:
                 new_token = access_token_data.get("accessToken")
                 user_id = access_token_data.get("customerId")
@@ -102,7 +112,9 @@ class AnxinJiaControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 
                 await self.hass.config_entries.async_update_entry(current_entry,data={
                     CONF_USER_ID: user_id,
-                    CONF_TOKEN: new_token
+                    CONF_TOKEN: new_token,
+                    CONF_USERNAME: username,
+                    CONF_PASSWORD: password
                 })
                 return self.async_abort(reason="Configuration updated")
             else:
@@ -110,7 +122,7 @@ class AnxinJiaControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         # 检查 userid 和 token
         if userid_input and token_input:
-            userinfo = await getUserDetailById(token_input,userid_input)
+            userinfo = await self._async_get_user_detail(token_input,userid_input)
             if userinfo:
                 userNickname = userinfo.get("userNickname")
                 userPhone = userinfo.get("userPhone")
@@ -126,6 +138,22 @@ class AnxinJiaControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 
         return await self.async_show_error_form("invalid_credentials",step_id="reconfigure")        
         
+    async def _async_login(self, username, password):
+        """配置流程尚无条目客户端，使用临时客户端完成登录。"""
+        client = AnxinJiaClient()
+        try:
+            return await async_login_auth2(client, username, password)
+        finally:
+            await client.async_close()
+
+    async def _async_get_user_detail(self, token, user_id):
+        """使用临时客户端校验用户 ID 与令牌。"""
+        client = AnxinJiaClient()
+        try:
+            return await getUserDetailById(client, token, user_id)
+        finally:
+            await client.async_close()
+
     async def async_show_error_form(self, error_type,step_id="user"):
         """Show error form when configuration fails."""
         errors = {}
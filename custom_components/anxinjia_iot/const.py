@@ -8,4 +8,59 @@ LastEditTime: 2025-02-28 15:35:38
 '''
 DOMAIN = "anxinjia_iot"
 CONF_USER_ID = "user_id"
-CONF_TOKEN = "access_token"
\ No newline at end of file
+CONF_TOKEN = "access_token"
+
+# 状态轮询间隔（秒）
+STATUS_UPDATE_INTERVAL = 60
+
+# 自适应轮询：控制命令或场景之后的 FAST_POLL_WINDOW 秒内按 FAST_POLL_INTERVAL 轮询；
+# 连续 IDLE_POLL_AFTER 轮没有变化后逐步放慢到 IDLE_POLL_INTERVAL；
+# 云端出错时按 2 的幂退避，最长 ERROR_BACKOFF_MAX；每次间隔加上 ±POLL_JITTER 的随机抖动
+FAST_POLL_INTERVAL = 10
+FAST_POLL_WINDOW = 120
+IDLE_POLL_AFTER = 3
+IDLE_POLL_INTERVAL = 300
+ERROR_BACKOFF_MAX = 900
+POLL_JITTER = 0.1
+
+# eqNumberBatch 状态查询分片大小与并发上限
+STATUS_CHUNK_SIZE = 50
+STATUS_MAX_CONCURRENCY = 4
+
+# 云端请求限流：{类别: (每秒请求数, 突发容量)}，所有配置条目共享
+RATE_LIMITS = {
+    "control": (5.0, 10),
+    "status": (2.0, 4),
+    "discovery": (2.0, 5),
+}
+
+# 请求调度：同时在途的请求数上限，以及只留给控制命令和场景的名额
+SCHEDULER_MAX_INFLIGHT = 8
+SCHEDULER_RESERVED = 2
+
+# 控制命令成功后，等待多少秒再单独查询该设备确认状态
+CONFIRM_DELAY = 3
+
+# 同一场景在该时间（秒）内的重复按下只执行一次
+SCENE_DEDUPE_WINDOW = 2.0
+
+# 场景模式开关打开后自动复位的延迟（秒）
+VIRTUAL_SWITCH_RESET_DELAY = 2
+
+# 设备列表每页的设备数，以及同时请求的页数（当前页加上提前请求的页）
+DEVICE_PAGE_SIZE = 100
+DEVICE_PAGE_LOOKAHEAD = 3
+# 单个列表最多请求的页数，防止服务端分页异常时无限翻页
+DEVICE_PAGE_MAX = 200
+
+# 后台增量设备发现间隔（秒）
+DEVICE_SYNC_INTERVAL = 1800
+
+# 场景目录后台同步间隔（秒）
+SCENE_SYNC_INTERVAL = 900
+
+# bulk_set 服务同时下发的控制命令数
+BULK_MAX_CONCURRENCY = 8
+
+# 自动重新登录失败后，再次尝试前的冷却时间（秒）
+REAUTH_COOLDOWN = 300
\ No newline at end of file
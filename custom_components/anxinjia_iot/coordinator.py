@@ -0,0 +1,314 @@
+# coordinator.py
+import logging
+import random
+import time
+from datetime import timedelta
+from typing import Callable, Optional
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from .const import (
+    DOMAIN,
+    STATUS_UPDATE_INTERVAL,
+    CONFIRM_DELAY,
+    FAST_POLL_INTERVAL,
+    FAST_POLL_WINDOW,
+    IDLE_POLL_AFTER,
+    IDLE_POLL_INTERVAL,
+    ERROR_BACKOFF_MAX,
+    POLL_JITTER,
+)
+from .api import AnxinJiaClient, DeviceStatusBatch, async_get_all_devices_status
+from .status import DeviceStatus
+from .device import Device, DeviceIndex
+from .models import get_model
+
+_LOGGER = logging.getLogger(__name__)
+
+class AnxinJiaCoordinator(DataUpdateCoordinator[dict[str, DeviceStatus]]):
+    """每个地址（房屋）一个的状态轮询协调器。
+
+    每个周期为本地址的设备发起一轮 eqNumberBatch 请求，结果为 {virtualNumber: DeviceStatus}，
+    由开关、灯和窗帘实体共同订阅；控制命令成功后只查询该设备确认状态，轮询间隔随活跃程度自适应。
+    """
+
+    def __init__(self, hass: HomeAssistant, client: AnxinJiaClient, eq_numbers: list[str], address_id: Optional[str] = None, confirm_delay: float = CONFIRM_DELAY, index: Optional[DeviceIndex] = None):
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{address_id}" if address_id else DOMAIN,
+            update_interval=timedelta(seconds=STATUS_UPDATE_INTERVAL),
+        )
+        self.client = client
+        self.eq_numbers = eq_numbers
+        self.address_id = address_id
+        self.confirm_delay = confirm_delay
+        self.index = index
+        # 上次通知实体时的拉取结果，成功与失败切换时需要通知全部实体刷新可用状态
+        self._notified_success: Optional[bool] = None
+        # 所有轮询共用的状态记录，按 virtualNumber 复用；已知设备按其类型的解析表预先创建
+        self._records: dict[str, DeviceStatus] = {}
+        for eq_number in eq_numbers if index is not None else ():
+            device = index.device(eq_number)
+            if device is not None:
+                self._add_records(device)
+        # 等待确认的目标状态：{eqNumber: {virtualNumber: 目标状态}}，以及各 eqNumber 的确认定时器
+        self._expected: dict[str, dict[str, bool]] = {}
+        self._confirm_timers: dict[str, Callable[[], None]] = {}
+        # 还在下发中的命令数：{eqNumber: 条数}
+        self._in_flight: dict[str, int] = {}
+        # 自适应轮询状态
+        self._fast_until = 0.0
+        self._unchanged_polls = 0
+        self._errors = 0
+        self._cancel_kick: Optional[Callable[[], None]] = None
+        # 上一轮查询失败的 eqNumber，只在集合变化时告警
+        self._failed_eq_numbers: frozenset[str] = frozenset()
+
+    def _add_records(self, device: Device) -> None:
+        """按设备类型的解析表为设备的每个 virtualNumber 创建状态记录。"""
+        known = get_model(device.model_type).status_properties
+        for virtual_model in device.virtual_models:
+            self._records[virtual_model.virtual_number] = DeviceStatus(virtual_model.virtual_number, device.eq_number, known)
+
+    @callback
+    def async_add_device(self, device: Device) -> None:
+        """后台发现新增设备时加入轮询，之后的轮询开始获取它的状态。"""
+        if not get_model(device.model_type).polled or device.eq_number in self.eq_numbers:
+            return
+        self.eq_numbers.append(device.eq_number)
+        self._add_records(device)
+
+    @callback
+    def async_remove_device(self, device: Device) -> None:
+        """设备被删除或重建时停止轮询，并丢弃它的状态和未完成的确认。"""
+        if device.eq_number in self.eq_numbers:
+            self.eq_numbers.remove(device.eq_number)
+        for virtual_model in device.virtual_models:
+            self._records.pop(virtual_model.virtual_number, None)
+            if self.data:
+                self.data.pop(virtual_model.virtual_number, None)
+        self._expected.pop(device.eq_number, None)
+        self._in_flight.pop(device.eq_number, None)
+        cancel = self._confirm_timers.pop(device.eq_number, None)
+        if cancel is not None:
+            cancel()
+
+    @callback
+    def async_restore(self, snapshot: dict[str, list]) -> None:
+        """用 snapshot() 保存的最近已知状态预填快照，只恢复本地址已知设备的记录。"""
+        data = DeviceStatusBatch()
+        for virtual_number, values in snapshot.items():
+            record = self._records.get(virtual_number)
+            if record is None or not isinstance(values, list):
+                continue
+            record.restore(values)
+            data[virtual_number] = record
+        if data:
+            self.data = data
+            _LOGGER.debug(f"{self.name} 从快照恢复了 {len(data)} 个实体的状态")
+
+    def snapshot(self) -> dict[str, list]:
+        """当前快照中各 virtualNumber 的最近已知状态。"""
+        snapshot = {}
+        for virtual_number, record in (self.data or {}).items():
+            values = record.snapshot()
+            if values is not None:
+                snapshot[virtual_number] = values
+        return snapshot
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """只通知状态有变化的实体；拉取成功与失败切换或没有索引时通知全部实体。"""
+        changed = getattr(self.data, "changed", None)
+        if self.index is None or changed is None or self.last_update_success != self._notified_success:
+            self._notified_success = self.last_update_success
+            super().async_update_listeners()
+            return
+        self.async_notify(changed)
+
+    @callback
+    def async_notify(self, virtual_numbers) -> None:
+        """通知指定 virtualNumber 对应的实体刷新。"""
+        if self.index is None:
+            super().async_update_listeners()
+            return
+        for virtual_number in virtual_numbers:
+            for entity in self.index.entities(virtual_number):
+                entity.async_handle_status_update()
+
+    def _apply_expected(self, eq_number: str, states: dict[str, bool], target: Optional[dict[str, DeviceStatus]]) -> None:
+        """把目标开关状态写入状态记录，并放入 target 快照。"""
+        for virtual_number, state in states.items():
+            record = self._records.get(virtual_number)
+            if record is None:
+                record = self._records[virtual_number] = DeviceStatus(virtual_number, eq_number)
+            record.assume(state)
+            if target is not None:
+                target[virtual_number] = record
+
+    @callback
+    def _async_merge(self, status: DeviceStatusBatch) -> None:
+        """把单个设备的查询结果并入当前快照，并一次性通知所有实体。
+
+        不重置轮询计时，下个周期仍按原计划拉取云端状态。
+        """
+        data = DeviceStatusBatch()
+        if self.data:
+            data.update(self.data)
+        data.update(status)
+        data.changed = status.changed
+        self.data = data
+        self.async_update_listeners()
+
+    @callback
+    def async_expect_pending(self, eq_number: str, states: dict[str, bool]) -> None:
+        """命令下发前记录目标状态，下发期间到达的轮询结果以目标状态为准。
+
+        下发结束后必须调用 async_expect(pending=True)（成功）或 async_forget_expected（失败或被取代）。
+        """
+        self._in_flight[eq_number] = self._in_flight.get(eq_number, 0) + 1
+        self._expected.setdefault(eq_number, {}).update(states)
+        self._apply_expected(eq_number, states, self.data)
+
+    def _async_done_in_flight(self, eq_number: str) -> None:
+        count = self._in_flight.get(eq_number, 0) - 1
+        if count > 0:
+            self._in_flight[eq_number] = count
+        else:
+            self._in_flight.pop(eq_number, None)
+
+    @callback
+    def async_forget_expected(self, eq_number: str, states: dict[str, bool]) -> None:
+        """命令下发失败：撤销 async_expect_pending 记录的目标状态，状态记录恢复为 states。
+
+        命令被同一实体的后续命令取代时传入空的 states，只结束下发计数，保留后续命令的目标状态。
+        """
+        self._async_done_in_flight(eq_number)
+        expected = self._expected.get(eq_number)
+        if expected is not None:
+            for virtual_number in states:
+                expected.pop(virtual_number, None)
+            if not expected:
+                self._expected.pop(eq_number, None)
+        self._apply_expected(eq_number, states, self.data)
+
+    @callback
+    def async_expect(self, eq_number: str, states: dict[str, bool], pending: bool = False) -> None:
+        """记录控制命令的目标状态，并在 confirm_delay 秒后单独查询该设备确认。
+
+        同一设备短时间内的多条命令合并为一次确认查询。目标状态同时并入快照，
+        但不通知实体，由调用方自行写入。pending 表示命令由 async_expect_pending 开始，在这里结束。
+        """
+        if pending:
+            self._async_done_in_flight(eq_number)
+        self._expected.setdefault(eq_number, {}).update(states)
+        self.async_note_activity()
+        self._apply_expected(eq_number, states, self.data)
+        cancel = self._confirm_timers.pop(eq_number, None)
+        if cancel is not None:
+            cancel()
+
+        @callback
+        def _schedule_confirm(_now) -> None:
+            self._confirm_timers.pop(eq_number, None)
+            self.config_entry.async_create_background_task(
+                self.hass, self._async_confirm(eq_number), f"{DOMAIN}_confirm_{eq_number}"
+            )
+
+        self._confirm_timers[eq_number] = async_call_later(self.hass, self.confirm_delay, _schedule_confirm)
+
+    async def _async_confirm(self, eq_number: str) -> None:
+        """查询单个设备的实际状态，与目标状态不一致时回滚。"""
+        expected = dict(self._expected.get(eq_number, {}))
+        status = await async_get_all_devices_status(self.client, [eq_number], records=self._records)
+        if eq_number in self._confirm_timers or eq_number in self._in_flight:
+            # 查询期间又有新命令或命令还在下发，重新写回目标状态，等待下一次确认
+            self._apply_expected(eq_number, self._expected.get(eq_number, {}), None)
+        else:
+            self._expected.pop(eq_number, None)
+        if not status:
+            # 查询失败时保留乐观状态，由下一轮常规轮询纠正
+            _LOGGER.debug(f"确认 {eq_number} 状态失败，等待下一轮轮询")
+            return
+        for virtual_number, state in expected.items():
+            record = status.get(virtual_number)
+            if record is not None and record.is_on is not None and record.is_on != state:
+                _LOGGER.warning(f"{virtual_number} 未跟随控制命令，回滚为云端状态 {record.is_on}")
+        self._async_merge(status)
+
+    @callback
+    def async_note_activity(self) -> None:
+        """记录一次控制命令或场景执行，接下来的 FAST_POLL_WINDOW 秒内快速轮询。"""
+        self._fast_until = time.monotonic() + FAST_POLL_WINDOW
+        self._unchanged_polls = 0
+        if self._errors or self._cancel_kick is not None:
+            return
+        if self.update_interval is None or self.update_interval.total_seconds() > FAST_POLL_INTERVAL:
+            # 当前处于慢速轮询，提前触发一次刷新，刷新后按快速间隔重新计时
+            self.update_interval = timedelta(seconds=FAST_POLL_INTERVAL)
+            self._cancel_kick = async_call_later(self.hass, FAST_POLL_INTERVAL, self._async_kick)
+
+    async def _async_kick(self, _now) -> None:
+        self._cancel_kick = None
+        await self.async_request_refresh()
+
+    def _next_interval(self) -> timedelta:
+        """根据错误次数、最近的活动和状态变化计算下一次轮询间隔。"""
+        if self._errors:
+            seconds = min(ERROR_BACKOFF_MAX, STATUS_UPDATE_INTERVAL * 2 ** (self._errors - 1))
+        elif time.monotonic() < self._fast_until:
+            seconds = FAST_POLL_INTERVAL
+        elif self._unchanged_polls >= IDLE_POLL_AFTER:
+            steps = self._unchanged_polls - IDLE_POLL_AFTER + 1
+            seconds = min(IDLE_POLL_INTERVAL, STATUS_UPDATE_INTERVAL * 1.5 ** steps)
+        else:
+            seconds = STATUS_UPDATE_INTERVAL
+        return timedelta(seconds=seconds * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER))
+
+    async def async_shutdown(self) -> None:
+        """取消所有未触发的确认和提前刷新定时器。"""
+        for cancel in self._confirm_timers.values():
+            cancel()
+        self._confirm_timers.clear()
+        if self._cancel_kick is not None:
+            self._cancel_kick()
+            self._cancel_kick = None
+        await super().async_shutdown()
+
+    async def _async_update_data(self) -> dict[str, DeviceStatus]:
+        """拉取所有设备的最新状态。"""
+        if not self.eq_numbers:
+            return {}
+        all_devices_status = await async_get_all_devices_status(self.client, self.eq_numbers, records=self._records)
+        if all_devices_status is None:
+            self._errors += 1
+            self.update_interval = self._next_interval()
+            raise UpdateFailed("Failed to fetch device statuses")
+        self._errors = 0
+        _LOGGER.debug(f"Success fetch device statuses: {len(all_devices_status)} 个, 变化 {len(all_devices_status.changed)} 个")
+        failed = frozenset(all_devices_status.failed_eq_numbers)
+        if failed != self._failed_eq_numbers:
+            if failed:
+                _LOGGER.warning(f"{self.name} 部分设备状态获取失败: {sorted(failed)}")
+            else:
+                _LOGGER.info(f"{self.name} 设备状态已全部恢复获取")
+            self._failed_eq_numbers = failed
+        if all_devices_status.partial and self.data:
+            # 失败分片的设备沿用上一次的状态，而不是整体丢弃本轮结果
+            merged = DeviceStatusBatch()
+            merged.update(self.data)
+            merged.update(all_devices_status)
+            merged.failed_eq_numbers = all_devices_status.failed_eq_numbers
+            merged.changed = all_devices_status.changed
+            all_devices_status = merged
+        for eq_number, states in self._expected.items():
+            # 还在等待确认的设备以目标状态为准，避免常规轮询读到旧状态后来回跳变
+            self._apply_expected(eq_number, states, all_devices_status)
+        if self.data is not None and not all_devices_status.changed:
+            self._unchanged_polls += 1
+        else:
+            self._unchanged_polls = 0
+        self.update_interval = self._next_interval()
+        _LOGGER.debug(f"{self.name} 下次轮询间隔 {self.update_interval.total_seconds():.0f}s")
+        return all_devices_status
@@ -12,6 +12,7 @@ from homeassistant.components.cover import (
 )
 from .const import DOMAIN,CONF_TOKEN
 from .api import async_Control_cover
+from .entity import AnxinJiaEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,33 +22,21 @@ async def async_setup_entry(
         async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the AnxinJia switches from a config entry."""
-    devices = hass.data[DOMAIN]['devices'][config_entry.entry_id]
-
-    # 创建实体列表
-    new_entities = []
-    
-    # 遍历设备列表，创建 AnxinJiaSwitch 实例
-    for device_info in devices:
-        # 替换为适当的属性访问
-        if device_info.model_type == 102004:
-            for virtual_model in device_info.virtual_models:  # 确保使用正确的属性名称
-                entity = AnxinJiaCurtain(device_info, virtual_model)
-                new_entities.append(entity)
-
-    # 异步添加实体到平台
-    if new_entities:
-        async_add_entities(new_entities, update_before_add=True)
+    # 已有设备的实体由设备目录创建，之后后台发现的新设备也会加到本平台
+    catalogue = hass.data[DOMAIN][config_entry.entry_id]["catalogue"]
+    catalogue.async_add_platform("cover", AnxinJiaCurtain, async_add_entities)
         
-class AnxinJiaCurtain(CoverEntity):
+class AnxinJiaCurtain(AnxinJiaEntity, CoverEntity):
     """Representation of a curtain."""
 
-    def __init__(self, device, virtual_model):
+    def __init__(self, coordinator, client, device, virtual_model):
         """Initialize the curtain."""
+        super().__init__(coordinator)
+        self._client = client
         self._device = device     
-        self._name = f"{device.room_name}{virtual_model.get('virtualName')}"  # 使用 Device 类的 name 属性
-        self._unique_id = virtual_model.get("virtualNumber")  # 使用 Device 类的 unique_id 属性
-        self._model_type = virtual_model.get("modelType")  # 获取设备的模型类型
-        self._is_open = False  # True for open, False for closed
+        self._name = self.entity_name(device, virtual_model)  # 房间名称加虚拟名称
+        self._unique_id = virtual_model.virtual_number  # 使用 Device 类的 unique_id 属性
+        self._model_type = virtual_model.model_type  # 获取设备的模型类型
         self._attr_device_class = CoverDeviceClass.CURTAIN 
         self._attr_unique_id = self._unique_id  # 确保唯一标识符
         self._attr_name = self._name  # 实体名称
@@ -62,13 +51,8 @@ class AnxinJiaCurtain(CoverEntity):
         self._prop_position_value_range = 100
         self._prop_current_position = 50
         
-        self._attr_device_info = {
-            "identifiers": {(DOMAIN, device.eq_number)},  # 设备的唯一标识符
-            "name": device.name ,  # 设备名称
-            "manufacturer": "aciga",  # 制造商
-            "model": self._model_type,  # 设备型号
-            "sw_version": "v1.0",  # 软件版本
-        }
+        # 同一物理设备的所有实体共用一个 device_info
+        self._attr_device_info = device.device_info
         
     @property
     def name(self):
@@ -93,6 +77,9 @@ class AnxinJiaCurtain(CoverEntity):
     @property
     def is_closed(self):
         """Return if the cover is closed."""
+        record = self._status
+        if record is not None and record.position is not None:
+            return record.position == 0
         return None
 
     @property
@@ -101,7 +88,8 @@ class AnxinJiaCurtain(CoverEntity):
 
         0: the cover is closed, 100: the cover is fully opened, None: unknown.
         """
-        pos = self._prop_current_position
+        record = self._status
+        pos = record.position if record is not None and record.position is not None else self._prop_current_position
         return round(pos*100/self._prop_position_value_range)
  
     async def async_set_cover_position(self, **kwargs) -> None:
@@ -111,58 +99,48 @@ class AnxinJiaCurtain(CoverEntity):
             return None
         pos = round(pos*self._prop_position_value_range/100)
         
-        try:
-            if pos > 50:
-                result = await async_Control_cover(self._name,self._unique_id,self._model_type, "open")
-            else:
-                result = await async_Control_cover(self._name,self._unique_id,self._model_type, "close")
-                if result:
-                    self._is_open = False
-                _LOGGER.info(f"set_cover API 调用成功: {result}")
-        except Exception as e:
-                _LOGGER.error(f"set_cover API 调用失败: {e}")
-            
+        # 云端只支持打开、关闭和停止，超过一半时打开，否则关闭；拖动滑块时只有最后一个位置会发往云端
+        await self._async_command("open" if pos > 50 else "close", "set_cover")
+
     async def async_stop_cover(self, **kwargs) -> None:
         """Stop the cover."""
-        # 在这里实现停止窗帘的逻辑，例如发送命令到设备
-        try:
-            # 调用 api.py 中的异步函数
-            result = await async_Control_cover(self._name,self._unique_id,self._model_type, "stop")
-            # 处理 result，记录日志或更新状态
-            if result:
-                self._is_open = False
-            _LOGGER.info(f"stop_cover API 调用成功: {result}")
-        except Exception as e:
-            _LOGGER.error(f"stop_cover API 调用失败: {e}")
-            
+        await self._async_command("stop", "stop_cover")
+
     async def async_open_cover(self, **kwargs):
         """Open the curtain."""
-        # 在这里实现打开窗帘的逻辑，例如发送命令到设备
-        try:
-            # 调用 api.py 中的异步函数
-            result = await async_Control_cover(self._name,self._unique_id,self._model_type, "open")
-            # 处理 result，记录日志或更新状态
-            if result:
-                self._is_open = True
-            _LOGGER.info(f"open_cover API 调用成功: {result}")
-        except Exception as e:
-            _LOGGER.error(f"open_cover API 调用失败: {e}")
+        await self._async_command("open", "open_cover")
 
     async def async_close_cover(self, **kwargs):
         """Close the curtain."""
-        # 在这里实现关闭窗帘的逻辑，例如发送命令到设备
+        await self._async_command("close", "close_cover")
+
+    async def _async_command(self, opt_means: str, action: str) -> None:
+        """下发窗帘命令。位置以轮询到的状态为准，命令成功后让协调器加快轮询。"""
         try:
             # 调用 api.py 中的异步函数
-            result = await async_Control_cover(self._name,self._unique_id,self._model_type, "close")
-            # 处理 result，记录日志或更新状态
-            if result:
-                self._is_open = False
-            _LOGGER.info(f"close_cover API 调用成功: {result}")
+            result = await async_Control_cover(self._client, self._name, self._unique_id, self._model_type, opt_means)
         except Exception as e:
-            _LOGGER.error(f"close_cover API 调用失败: {e}")
-            
+            _LOGGER.error(f"{action} API 调用失败: {e}")
+            return
+        if result is None:
+            # 命令在发送前被同一实体的后续命令取代，状态以后续命令为准
+            return
+        _LOGGER.info(f"{action} API 调用成功: {result}")
+        if result:
+            self.coordinator.async_note_activity()
+
     async def async_added_to_hass(self):
         """Called when the entity is added to hass for initialization or state update."""
         #self._attr_icon = "mdi:curtains"
         #await self.async_update()  # 默认调用一次更新
-        pass
\ No newline at end of file
+        # 订阅协调器的状态更新
+        await super().async_added_to_hass()
+
+    def _update_from_coordinator(self):
+        """从协调器快照中读取位置，在线状态由 available 直接读取 DeviceStatus。"""
+        record = self._status
+        if record is not None and record.position is not None:
+            self._prop_current_position = record.position
+
+    def _state_signature(self):
+        return (self.available, self._prop_current_position)
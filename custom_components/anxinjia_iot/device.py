@@ -1,25 +1,228 @@
 # device.py
+import sys
+from typing import Any, Optional
+from .const import DOMAIN
+
+def _intern(value: Any) -> Any:
+    """驻留字符串：房间名、房屋名、设备型号名等在大量设备之间重复，只保留一份。"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _discard(index: dict[Any, list], key: Any, device: "Device") -> None:
+    """从分组索引中移除设备；分组列表保留，平台持有的列表引用仍然有效。"""
+    devices = index.get(key)
+    if devices is not None and device in devices:
+        devices.remove(device)
+
+class VirtualModel:
+    """设备下的一个虚拟模型，例如开关的一路回路、窗帘电机或场景面板上的场景键。"""
+
+    __slots__ = ("virtual_number", "virtual_name", "model_type", "is_virtual")
+
+    def __init__(self, virtual_number: str, virtual_name: Optional[str], model_type: Optional[int], is_virtual: bool = False):
+        self.virtual_number = virtual_number
+        self.virtual_name = _intern(virtual_name)
+        self.model_type = model_type
+        # 本地生成的场景模式开关，没有对应的云端状态
+        self.is_virtual = is_virtual
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "VirtualModel":
+        """从云端返回的 virtualModels 条目创建。"""
+        return cls(data.get("virtualNumber"), data.get("virtualName"), _to_int(data.get("modelType")))
+
+    def to_dict(self) -> dict:
+        """还原为 virtualModels 条目的格式，用于写入缓存。"""
+        return {"virtualNumber": self.virtual_number, "virtualName": self.virtual_name, "modelType": self.model_type}
+
 class Device:
-    """表示一个智能设备，包含多个虚拟模型。"""
+    """表示一个智能设备，包含多个虚拟模型。
+
+    使用 __slots__ 并驻留重复的字符串；device_info 在设备创建时生成一次，
+    该设备下的所有实体共用同一个对象。
+    """
+
+    __slots__ = (
+        "house_name",
+        "house_uid",
+        "room_name",
+        "project_id",
+        "eq_number",
+        "eq_name",
+        "eq_type",
+        "model_type",
+        "supplier_type",
+        "online",
+        "physics_id",
+        "icon",
+        "icon_url",
+        "physics_name",
+        "user_id",
+        "create_time",
+        "eq_uid",
+        "eq_id",
+        "name",
+        "virtual_models",
+        "address_id",
+        "device_info",
+    )
 
     def __init__(self, data):
-        self.house_name = data.get("houseName")
-        self.house_uid = data.get("houseUid")
-        self.room_name = data.get("roomName")
-        self.project_id = data.get("projectId")
+        self.house_name = _intern(data.get("houseName"))
+        self.house_uid = _intern(data.get("houseUid"))
+        self.room_name = _intern(data.get("roomName"))
+        self.project_id = _intern(data.get("projectId"))
         self.eq_number = data.get("eqNumber")
-        self.eq_name = data.get("eqName","unknown")
-        self.eq_type = data.get("eqType")
+        self.eq_name = _intern(data.get("eqName","unknown"))
+        self.eq_type = _intern(data.get("eqType"))
         self.model_type = int(data.get("modelType","10000"))
-        self.supplier_type = data.get("supplierType")
+        self.supplier_type = _intern(data.get("supplierType"))
         self.online = data.get("online")
-        self.physics_id = data.get("physicsId")
-        self.icon = data.get("icon")
-        self.icon_url = data.get("iconUrl")
-        self.physics_name = data.get("physicsName","unknown")
-        self.user_id = data.get("userId")
+        self.physics_id = _intern(data.get("physicsId"))
+        self.icon = _intern(data.get("icon"))
+        self.icon_url = _intern(data.get("iconUrl"))
+        self.physics_name = _intern(data.get("physicsName","unknown"))
+        self.user_id = _intern(data.get("userId"))
         self.create_time = data.get("createTime")
         self.eq_uid = data.get("eqUid")
         self.eq_id = data.get("eqId")
         self.name= f"{self.physics_name}/{self.eq_name}"
-        self.virtual_models = data.get("virtualModels", [])
+        self.virtual_models = tuple(VirtualModel.from_dict(vm) for vm in data.get("virtualModels") or ())
+        # 设备所属的地址（房屋），由发现链路按地址标记
+        self.address_id = _intern(data.get("addressId"))
+        self.device_info = {
+            "identifiers": {(DOMAIN, self.eq_number)},  # 设备的唯一标识符
+            "name": self.name,  # 设备名称
+            "manufacturer": "aciga",  # 制造商
+            "model": self.model_type,  # 设备型号
+            "sw_version": "v1.0",  # 软件版本
+        }
+
+    def to_dict(self) -> dict:
+        """还原为云端设备列表条目的格式，用于写入缓存；Device(device.to_dict()) 与原设备一致。"""
+        return {
+            "houseName": self.house_name,
+            "houseUid": self.house_uid,
+            "roomName": self.room_name,
+            "projectId": self.project_id,
+            "eqNumber": self.eq_number,
+            "eqName": self.eq_name,
+            "eqType": self.eq_type,
+            "modelType": self.model_type,
+            "supplierType": self.supplier_type,
+            "online": self.online,
+            "physicsId": self.physics_id,
+            "icon": self.icon,
+            "iconUrl": self.icon_url,
+            "physicsName": self.physics_name,
+            "userId": self.user_id,
+            "createTime": self.create_time,
+            "eqUid": self.eq_uid,
+            "eqId": self.eq_id,
+            "addressId": self.address_id,
+            "virtualModels": [virtual_model.to_dict() for virtual_model in self.virtual_models],
+        }
+
+class DeviceIndex:
+    """单个配置条目的设备索引，创建 Device 时一次性建立。
+
+    按 eqNumber、virtualNumber、modelType、房间和地址（房屋）建立字典索引，
+    并记录每个 virtualNumber 对应的实体，供平台初始化、状态分发和批量操作直接查找。
+    迭代时按加入顺序返回全部设备。后台发现可以增量地加入和移除设备。
+    """
+
+    def __init__(self):
+        self._devices: list[Device] = []
+        self._by_eq_number: dict[str, Device] = {}
+        self._by_virtual_number: dict[str, tuple[Device, VirtualModel]] = {}
+        self._by_model_type: dict[int, list[Device]] = {}
+        self._by_room: dict[str, list[Device]] = {}
+        self._by_house: dict[str, list[Device]] = {}
+        self._by_platform: dict[str, list[Device]] = {}
+        self._entities: dict[str, list] = {}
+
+    def add(self, device: Device) -> None:
+        """加入一个设备并更新所有索引，同时按设备类型注册的平台归类。"""
+        from .models import get_model
+
+        self._devices.append(device)
+        for platform in get_model(device.model_type).platforms:
+            self._by_platform.setdefault(platform, []).append(device)
+        self._by_eq_number[device.eq_number] = device
+        self._by_model_type.setdefault(device.model_type, []).append(device)
+        self._by_room.setdefault(device.room_name, []).append(device)
+        self._by_house.setdefault(device.address_id, []).append(device)
+        for virtual_model in device.virtual_models:
+            if virtual_model.virtual_number is not None:
+                self._by_virtual_number[virtual_model.virtual_number] = (device, virtual_model)
+
+    def remove(self, device: Device) -> None:
+        """从所有索引中移除一个设备，并清除其 virtualNumber 对应的实体记录。"""
+        from .models import get_model
+
+        if device not in self._devices:
+            return
+        self._devices.remove(device)
+        for platform in get_model(device.model_type).platforms:
+            _discard(self._by_platform, platform, device)
+        if self._by_eq_number.get(device.eq_number) is device:
+            del self._by_eq_number[device.eq_number]
+        _discard(self._by_model_type, device.model_type, device)
+        _discard(self._by_room, device.room_name, device)
+        _discard(self._by_house, device.address_id, device)
+        for virtual_model in device.virtual_models:
+            found = self._by_virtual_number.get(virtual_model.virtual_number)
+            if found is not None and found[0] is device:
+                del self._by_virtual_number[virtual_model.virtual_number]
+                self._entities.pop(virtual_model.virtual_number, None)
+
+    def __iter__(self):
+        return iter(self._devices)
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def device(self, eq_number: str):
+        """按 eqNumber 查找设备。"""
+        return self._by_eq_number.get(eq_number)
+
+    def virtual_model(self, virtual_number: str):
+        """按 virtualNumber 查找 (设备, 虚拟模型)，不存在时返回 None。"""
+        return self._by_virtual_number.get(virtual_number)
+
+    def of_model_type(self, model_type: int) -> list[Device]:
+        """返回指定 modelType 的设备。"""
+        return self._by_model_type.get(model_type, [])
+
+    def for_platform(self, platform: str) -> list[Device]:
+        """返回需要在指定平台创建实体的设备。
+
+        返回的是索引持有的列表，之后加入或移除的设备对调用方立即可见。
+        """
+        return self._by_platform.setdefault(platform, [])
+
+    def in_room(self, room_name: str) -> list[Device]:
+        """返回指定房间的设备。"""
+        return self._by_room.get(room_name, [])
+
+    def in_house(self, address_id: str) -> list[Device]:
+        """返回指定地址（房屋）的设备。"""
+        return self._by_house.get(address_id, [])
+
+    @property
+    def houses(self) -> dict[str, list[Device]]:
+        """按地址分组的设备。"""
+        return self._by_house
+
+    def register_entity(self, virtual_number: str, entity) -> None:
+        """记录 virtualNumber 对应的实体。"""
+        self._entities.setdefault(virtual_number, []).append(entity)
+
+    def entities(self, virtual_number: str) -> list:
+        """返回 virtualNumber 对应的实体。"""
+        return self._entities.get(virtual_number, [])
@@ -0,0 +1,43 @@
+# diagnostics.py
+from typing import Any
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN, CONF_TOKEN, CONF_USER_ID
+
+TO_REDACT = {CONF_TOKEN, CONF_PASSWORD, CONF_USERNAME, CONF_USER_ID}
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry) -> dict[str, Any]:
+    """导出配置条目的诊断信息：限流、请求调度与命令队列的统计，以及各地址的轮询状态。
+
+    限流器和请求调度器由所有条目共享，统计的是整个集成的请求。
+    """
+    domain_data = hass.data.get(DOMAIN, {})
+    data = domain_data.get(config_entry.entry_id)
+    diagnostics: dict[str, Any] = {
+        "entry": async_redact_data(dict(config_entry.data), TO_REDACT),
+    }
+    if "rate_limiter" in domain_data:
+        diagnostics["rate_limiter"] = domain_data["rate_limiter"].stats()
+    if "scheduler" in domain_data:
+        diagnostics["scheduler"] = domain_data["scheduler"].stats()
+    if data is None:
+        return diagnostics
+
+    client = data["client"]
+    diagnostics["commands"] = client.commands.stats()
+    diagnostics["scenes"] = {
+        "submitted": client.scene_runner.submitted,
+        "deduplicated": client.scene_runner.deduplicated,
+    }
+    diagnostics["devices"] = len(hass.data[DOMAIN]["devices"].get(config_entry.entry_id) or ())
+    diagnostics["coordinators"] = {
+        address_id: {
+            "devices": len(coordinator.eq_numbers),
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+        }
+        for address_id, coordinator in data["coordinators"].items()
+    }
+    return diagnostics
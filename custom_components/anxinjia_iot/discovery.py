@@ -0,0 +1,93 @@
+# discovery.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Iterable
+
+_LOGGER = logging.getLogger(__name__)
+
+StepFunc = Callable[[dict[str, Any]], Awaitable[Any]]
+
+class DiscoveryError(Exception):
+    """发现链路中的关键步骤失败。"""
+
+    def __init__(self, step: str):
+        super().__init__(f"Discovery step '{step}' failed")
+        self.step = step
+
+class DiscoveryStep:
+    """发现链路中的一个步骤。
+
+    func 接收已完成步骤的结果字典，requires 为依赖的步骤名称；
+    fatal 步骤返回 None/False 时视为失败，整个链路立即中止。
+    """
+
+    def __init__(self, name: str, func: StepFunc, requires: Iterable[str] = (), fatal: bool = True):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.fatal = fatal
+
+class DiscoveryPlan:
+    """按依赖关系并发执行的发现步骤图（DAG）。
+
+    依赖全部完成的步骤立即并发启动，因此总耗时约等于关键路径的长度；
+    任一关键步骤失败或抛出异常时取消其余正在执行的步骤。
+    """
+
+    def __init__(self, name: str = "discovery"):
+        self.name = name
+        self._steps: dict[str, DiscoveryStep] = {}
+        self.timings: dict[str, float] = {}
+
+    def add(self, name: str, func: StepFunc, requires: Iterable[str] = (), fatal: bool = True) -> "DiscoveryPlan":
+        """添加一个步骤，返回自身以便链式调用。"""
+        self._steps[name] = DiscoveryStep(name, func, requires, fatal)
+        return self
+
+    async def _async_run_step(self, step: DiscoveryStep, results: dict[str, Any]) -> Any:
+        start = time.monotonic()
+        try:
+            return await step.func(results)
+        finally:
+            self.timings[step.name] = time.monotonic() - start
+            _LOGGER.debug(f"[{self.name}] 步骤 {step.name} 耗时 {self.timings[step.name] * 1000:.0f} ms")
+
+    async def async_run(self, results: dict[str, Any] | None = None) -> dict[str, Any]:
+        """执行所有步骤并返回 {步骤名: 结果}。
+
+        results 可传入已知结果（例如上一阶段的输出），对应步骤不会再执行。
+        关键步骤失败时抛出 DiscoveryError，步骤自身抛出的异常原样向上传递。
+        """
+        results = dict(results or {})
+        pending = [name for name in self._steps if name not in results]
+        running: dict[asyncio.Task, str] = {}
+        start = time.monotonic()
+        try:
+            while pending or running:
+                for name in list(pending):
+                    step = self._steps[name]
+                    if all(dep in results for dep in step.requires):
+                        pending.remove(name)
+                        task = asyncio.ensure_future(self._async_run_step(step, results))
+                        running[task] = name
+                if not running:
+                    raise DiscoveryError(f"unresolved dependencies: {pending}")
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    result = task.result()
+                    if self._steps[name].fatal and (result is None or result is False):
+                        _LOGGER.warning(f"[{self.name}] 关键步骤 {name} 失败，中止后续步骤")
+                        raise DiscoveryError(name)
+                    results[name] = result
+        finally:
+            # 中止时取消仍在执行的步骤
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        _LOGGER.debug(f"[{self.name}] 完成，总耗时 {(time.monotonic() - start) * 1000:.0f} ms")
+        return results
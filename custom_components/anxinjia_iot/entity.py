@@ -0,0 +1,185 @@
+# entity.py
+import logging
+from typing import Any, Optional
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from .const import VIRTUAL_SWITCH_RESET_DELAY
+from .api import async_Control_SwitchOrLight
+from .coordinator import AnxinJiaCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+class AnxinJiaEntity(CoordinatorEntity[AnxinJiaCoordinator]):
+    """订阅地址协调器的实体基类。
+
+    每轮轮询后先把快照同步到实体，再与上次写入状态机的内容比较，只有变化时才写入；
+    同一轮轮询的所有写入在一次协调器回调中完成。
+    """
+
+    _written: Optional[tuple] = None
+    _unique_id: Optional[str] = None
+    is_virtual = False
+    _cancel_reset: Optional[CALLBACK_TYPE] = None
+
+    @property
+    def _status(self):
+        """协调器快照中本实体的 DeviceStatus，没有时返回 None。"""
+        return self.coordinator.data.get(self._unique_id) if self.coordinator.data else None
+
+    @property
+    def available(self) -> bool:
+        """协调器拉取失败或云端报告设备离线时不可用；场景模式开关只在本地切换，始终可用。"""
+        if self.is_virtual:
+            return True
+        record = self._status
+        return super().available and (record is None or record.online is not False)
+
+    def _update_from_coordinator(self) -> None:
+        """从协调器快照同步实体内部状态，由子类实现。"""
+
+    def _state_signature(self) -> tuple[Any, ...]:
+        """实体对外可见的状态，用于判断是否需要写入状态机。"""
+        return (self.available,)
+
+    @staticmethod
+    def entity_name(device, virtual_model) -> str:
+        """实体名称：场景模式开关只用虚拟名称，其它实体加上房间名称。"""
+        if virtual_model.is_virtual:
+            return virtual_model.virtual_name
+        return f"{device.room_name}{virtual_model.virtual_name}"
+
+    @callback
+    def async_update_device(self, device, virtual_model) -> None:
+        """设备或回路在云端改名后就地更新实体，不需要重新创建。"""
+        self._device = device
+        name = self.entity_name(device, virtual_model)
+        if name != self._name:
+            self._name = name
+            self._attr_name = name
+            if self.hass is not None:
+                self._async_write_state()
+
+    @callback
+    def _async_write_state(self) -> None:
+        """写入状态机并记录写入的内容。"""
+        self._written = self._state_signature()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_pulse(self, delay: float) -> None:
+        """打开后 delay 秒自动复位为关闭（场景模式开关），不占用调用方。"""
+        self._async_cancel_reset()
+        self._state = True
+        self._async_write_state()
+
+        @callback
+        def _async_reset(_now) -> None:
+            self._cancel_reset = None
+            self._state = False
+            self._async_write_state()
+
+        self._cancel_reset = async_call_later(self.hass, delay, _async_reset)
+
+    @callback
+    def _async_cancel_reset(self) -> None:
+        """取消尚未触发的自动复位。"""
+        if self._cancel_reset is not None:
+            self._cancel_reset()
+            self._cancel_reset = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        """实体移除时取消尚未触发的自动复位。"""
+        self._async_cancel_reset()
+        await super().async_will_remove_from_hass()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """协调器拉取到新状态时，只在实体状态有变化时写入。"""
+        self._update_from_coordinator()
+        if self._state_signature() != self._written:
+            self._async_write_state()
+
+    @callback
+    def async_handle_status_update(self) -> None:
+        """协调器按 virtualNumber 定向通知时调用；实体尚未加入 hass 时忽略。"""
+        if self.hass is None:
+            return
+        self._handle_coordinator_update()
+
+class AnxinJiaOnOffEntity(AnxinJiaEntity):
+    """开关与灯共用的开关实体。
+
+    场景模式开关（is_virtual）只在本地打开后自动复位；其它实体乐观地切换状态并下发命令，
+    失败时回滚，成功后由协调器单独查询确认设备是否跟随。
+    子类只需要提供平台的 _LOGGER 和日志中的实体类型 _kind。
+    """
+
+    _logger = _LOGGER
+    _kind = "switch"
+    _state = False
+
+    @property
+    def is_on(self):
+        return self._state
+
+    async def async_turn_on(self, **kwargs):
+        """Turn the entity on."""
+        if self.is_virtual:
+            # 虚拟开关打开后由定时回调自动关闭，不阻塞服务调用
+            self._async_pulse(VIRTUAL_SWITCH_RESET_DELAY)
+            self._logger.debug(f"虚拟 {self._kind} 已打开")
+        else:
+            await self._async_control(True)
+
+    async def async_turn_off(self, **kwargs):
+        """Turn the entity off."""
+        if self.is_virtual:
+            # 虚拟开关直接关闭状态并更新 Home Assistant
+            self._async_cancel_reset()
+            self._state = False
+            self._async_write_state()  # 更新 Home Assistant 状态
+            self._logger.debug(f"虚拟 {self._kind} 已关闭")
+        else:
+            await self._async_control(False)
+
+    async def _async_control(self, is_open: bool) -> None:
+        """乐观地切换状态并下发命令，失败时回滚，成功后由协调器单独查询确认设备是否跟随。
+
+        目标状态在下发前就交给协调器，命令排队或重试期间到达的轮询不会把实体改回旧状态。
+        """
+        eq_number = self._device.eq_number
+        previous = self._state
+        self._state = is_open
+        self.coordinator.async_expect_pending(eq_number, {self._unique_id: is_open})
+        self._async_write_state()
+        action = "on" if is_open else "off"
+        result = False
+        try:
+            # 调用 api.py 中的异步函数
+            result = await async_Control_SwitchOrLight(self._client, self._name, self._unique_id, self._model_type, is_open)
+        except Exception as e:
+            self._logger.error(f"{self._kind} {action} API 调用失败: {e}")
+        finally:
+            if result is None:
+                # 命令在发送前被同一实体的后续命令取代，状态以后续命令为准
+                self.coordinator.async_forget_expected(eq_number, {})
+            elif result:
+                self._logger.info(f"{self._kind} {action} API 调用成功: {result}")
+                self.coordinator.async_expect(eq_number, {self._unique_id: is_open}, pending=True)
+            else:
+                self.coordinator.async_forget_expected(eq_number, {self._unique_id: previous})
+                self._state = previous
+                self._async_write_state()
+
+    def _update_from_coordinator(self):
+        """从协调器快照中读取当前实体的开关状态。"""
+        if self.is_virtual:
+            return
+        record = self._status
+        if record is not None and record.is_on is not None and record.is_on != self._state:
+            self._state = record.is_on
+            self._logger.debug(f"Updated device state for {self._name}: {self._state}")
+
+    def _state_signature(self):
+        return (self.available, self._state)
@@ -0,0 +1,127 @@
+# models.py
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+from .device import Device, VirtualModel
+from .status import KNOWN_PROPERTIES
+
+# 已知的设备类型
+MODEL_SCENE_PANEL = 101001  # 场景面板
+MODEL_SWITCH = 102001  # 灯具开关
+MODEL_CURTAIN = 102004  # 窗帘
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """一种设备类型（modelType）的全部行为。
+
+    platforms 为创建实体的平台；polled 表示是否参与 eqNumberBatch 状态轮询；
+    payloads 为按命令预先构建好的 createJob 请求模板；status_properties 为 statusList 的解析表；
+    entity_models 用于不按云端 virtualModels 创建实体的类型（例如场景面板的场景模式开关）。
+    """
+
+    model_type: int
+    name: str
+    platforms: tuple[str, ...] = ()
+    polled: bool = False
+    payloads: dict[Any, dict] = field(default_factory=dict)
+    status_properties: dict = field(default_factory=lambda: KNOWN_PROPERTIES)
+    entity_models: Optional[Callable[[Device], tuple[VirtualModel, ...]]] = None
+
+    def build_payload(self, virtual_number: str, command: Any) -> Optional[dict]:
+        """按命令取出模板并填入 virtualNumber，不支持的命令返回 None。
+
+        模板中的嵌套字典只读共享，每条命令只新建最外层的字典。
+        """
+        template = self.payloads.get(command)
+        if template is None:
+            return None
+        return {**template, "virtualNumber": virtual_number}
+
+    def virtual_models(self, device: Device) -> tuple[VirtualModel, ...]:
+        """返回该设备需要创建实体的虚拟模型。"""
+        if self.entity_models is not None:
+            return self.entity_models(device)
+        return device.virtual_models
+
+MODEL_REGISTRY: dict[int, ModelSpec] = {}
+
+# 未注册的设备类型：只登记到设备注册表，不创建实体、不轮询
+UNKNOWN_MODEL = ModelSpec(0, "未知设备")
+
+def register_model(spec: ModelSpec) -> ModelSpec:
+    """注册一种设备类型，支持新的设备家族只需要调用一次。"""
+    MODEL_REGISTRY[spec.model_type] = spec
+    return spec
+
+def get_model(model_type: Optional[int]) -> ModelSpec:
+    """按 modelType 查找设备类型，未注册时返回 UNKNOWN_MODEL。"""
+    return MODEL_REGISTRY.get(model_type, UNKNOWN_MODEL)
+
+def _set_property_template(params: dict) -> dict:
+    return {
+        "type": "SET_PROPERTY",
+        "timeoutConfig": {
+            "num": 0,
+            "inProgressTimeoutInMinutes": 0
+        },
+        "jobDocument": {
+            "params": [params]
+        },
+    }
+
+def _invoke_service_template(desc: str, service_code: str, input_data: dict) -> dict:
+    return {
+        "desc": desc,
+        "jobDocument": {
+            "inputData": input_data,
+            "serviceCode": service_code
+        },
+        "type": "INVOKE_SERVICE",
+        "timeoutConfig": {
+            "inProgressTimeoutInSeconds": 0,
+            "num": 0
+        },
+    }
+
+# 场景面板上的场景模式开关数量
+SCENE_MODE_SWITCH_COUNT = 4
+
+def scene_mode_virtual_number(eq_number: str, i: int) -> str:
+    """场景模式开关的 virtualNumber，带上面板的 eqNumber，多个面板、房屋和条目之间不会冲突。"""
+    return f"{eq_number}_virtual_switch_{i}"
+
+def scene_mode_switches(device: Device) -> tuple[VirtualModel, ...]:
+    """场景面板上的四个场景模式开关。"""
+    return tuple(
+        VirtualModel(scene_mode_virtual_number(device.eq_number, i), f"场景模式{i}", MODEL_SCENE_PANEL, is_virtual=True)
+        for i in range(1, SCENE_MODE_SWITCH_COUNT + 1)
+    )
+
+register_model(ModelSpec(
+    MODEL_SWITCH,
+    "灯具开关",
+    platforms=("switch", "light"),
+    polled=True,
+    payloads={
+        True: _set_property_template({"onoff": 1}),
+        False: _set_property_template({"onoff": 0}),
+    },
+    status_properties={key: KNOWN_PROPERTIES[key] for key in ("isonoff", "online")},
+))
+
+register_model(ModelSpec(
+    MODEL_CURTAIN,
+    "窗帘",
+    platforms=("cover",),
+    polled=True,
+    payloads={
+        opt_means: _invoke_service_template("控制窗帘", "curtain_opt", {"opt_means": opt_means})
+        for opt_means in ("open", "close", "stop")
+    },
+))
+
+register_model(ModelSpec(
+    MODEL_SCENE_PANEL,
+    "场景面板",
+    platforms=("switch", "light", "button"),
+    entity_models=scene_mode_switches,
+))
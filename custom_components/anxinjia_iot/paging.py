@@ -0,0 +1,109 @@
+# paging.py
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, NamedTuple, Optional
+from .const import DEVICE_PAGE_SIZE, DEVICE_PAGE_LOOKAHEAD, DEVICE_PAGE_MAX
+
+_LOGGER = logging.getLogger(__name__)
+
+class Page(NamedTuple):
+    """列表接口返回的一页：条目，以及响应中带有时的总条数与总页数。"""
+
+    items: list
+    total: Optional[int] = None
+    pages: Optional[int] = None
+
+class DevicePageError(Exception):
+    """设备列表的某一页获取失败。"""
+
+    def __init__(self, page_no: int):
+        super().__init__(f"Device list page {page_no} failed")
+        self.page_no = page_no
+
+def _page_key(item: Any) -> Any:
+    return item.get("eqNumber") if isinstance(item, dict) else item
+
+async def async_iter_pages(
+    fetch_page: Callable[[int], Awaitable[Optional[Page]]],
+    page_size: int = DEVICE_PAGE_SIZE,
+    lookahead: int = DEVICE_PAGE_LOOKAHEAD,
+    max_pages: int = DEVICE_PAGE_MAX,
+    key: Callable[[Any], Any] = _page_key,
+) -> AsyncIterator[list]:
+    """按页号从 1 开始依次产出每一页的条目。
+
+    页面按顺序产出，第一页到达后调用方即可开始处理，不需要等最后一页。
+    第一页单独请求；第一页满页或带有 total / pages 时，之后提前并发请求后面 lookahead - 1 页，
+    否则逐页请求，小账号只多请求一页。同一时刻只保留窗口内的页面，内存占用与总条数无关。
+
+    结束条件依次为：
+    - 响应带有 total 或 pages 时，取满总条数或到达总页数；
+    - 空页；
+    - 与上一页条目（按 key 比较）完全相同，说明服务端忽略了页号；
+    - 不满一页。服务端可能把 pageSize 截断为更小的值，因此以第一页的实际条数作为每页条数，
+      第一页本身不满 page_size 时不据此判断为最后一页；
+    - 达到 max_pages 页的硬上限。
+    结束时取消窗口内多余的请求。某一页获取失败时抛出 DevicePageError；
+    上一页不满 page_size 时，之后的页面获取失败视为列表已结束。
+    """
+    window: deque[asyncio.Task] = deque()
+    next_page = 1
+    # 由响应中的 total / pages 确定的总页数，以及实际请求的最后一页
+    expected_pages: Optional[int] = None
+    last_page = max_pages
+    effective_size = page_size
+    received = 0
+    previous_keys = None
+    previous_short = False
+    # 第一页确定每页条数之前只请求一页
+    depth = 1
+    try:
+        while True:
+            while len(window) < depth and next_page <= last_page:
+                window.append(asyncio.create_task(fetch_page(next_page)))
+                next_page += 1
+            page_no = next_page - len(window)
+            page = await window.popleft()
+            if page is None:
+                if previous_short and expected_pages is None:
+                    _LOGGER.debug(f"列表第 {page_no} 页获取失败，上一页不满一页，视为列表结束")
+                    return
+                raise DevicePageError(page_no)
+            items = page.items or []
+            if not items:
+                return
+            keys = [key(item) for item in items]
+            if keys == previous_keys:
+                _LOGGER.warning(f"列表第 {page_no} 页与上一页相同，服务端可能忽略了页号，停止翻页")
+                return
+            previous_keys = keys
+            received += len(items)
+            previous_short = len(items) < page_size
+            yield items
+
+            if page_no == 1:
+                effective_size = min(page_size, len(items))
+                if page.pages is not None:
+                    expected_pages = page.pages
+                elif page.total is not None:
+                    expected_pages = -(-page.total // effective_size)
+                if expected_pages is not None:
+                    last_page = min(max_pages, expected_pages)
+                if expected_pages is not None or len(items) >= page_size:
+                    depth = lookahead
+            if page.total is not None and received >= page.total:
+                return
+            if page_no >= last_page:
+                if expected_pages is None or expected_pages > max_pages:
+                    _LOGGER.warning(f"列表已达到 {max_pages} 页的上限，停止翻页")
+                return
+            if page_no > 1 and len(items) < effective_size:
+                return
+    finally:
+        for task in window:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # 窗口内已完成但不再需要的页面，取走异常避免未处理告警
+                task.exception()
@@ -0,0 +1,89 @@
+# ratelimit.py
+import asyncio
+import logging
+import time
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# 接口对应的限流类别，未列出的接口归入 discovery
+ENDPOINT_RATE_CLASSES = {
+    "control": "control",
+    "scene_run": "control",
+    "device_status": "status",
+    # 登录用于令牌刷新，不参与限流，避免被其它请求阻塞
+    "login": None,
+}
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 capacity 个。
+
+    令牌不足时调用方按先来后到排队等待，而不是直接失败。
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        # asyncio.Lock 按等待顺序唤醒，保证排队公平
+        self._lock = asyncio.Lock()
+        # 统计：请求总数、被限流次数、累计等待秒数
+        self.requests = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def async_acquire(self) -> float:
+        """取得一个令牌，返回等待的秒数。"""
+        start = time.monotonic()
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+        waited = time.monotonic() - start
+        self.requests += 1
+        if waited > 0.001:
+            self.throttled += 1
+            self.throttled_seconds += waited
+            _LOGGER.debug(f"[{self.name}] 请求被限流 {waited * 1000:.0f} ms")
+        return waited
+
+    def stats(self) -> dict:
+        """返回限流统计。"""
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+
+class RateLimiter:
+    """所有配置条目共享的云端请求限流器，控制、状态、发现三类接口各自独立限额。"""
+
+    def __init__(self, limits: dict[str, tuple[float, float]]):
+        """
+        :param limits: {类别: (每秒请求数, 突发容量)}
+        """
+        self._buckets = {
+            name: TokenBucket(name, rate, capacity)
+            for name, (rate, capacity) in limits.items()
+        }
+
+    async def async_acquire(self, endpoint: Optional[str]) -> float:
+        """按接口所属类别取得令牌，返回等待的秒数；不限流的接口立即返回。"""
+        rate_class = ENDPOINT_RATE_CLASSES.get(endpoint, "discovery")
+        bucket = self._buckets.get(rate_class) if rate_class else None
+        if bucket is None:
+            return 0.0
+        return await bucket.async_acquire()
+
+    def stats(self) -> dict[str, dict]:
+        """返回各类别的限流统计。"""
+        return {name: bucket.stats() for name, bucket in self._buckets.items()}
@@ -0,0 +1,42 @@
+# retry.py
+import asyncio
+import random
+from dataclasses import dataclass
+import aiohttp
+
+# 值得重试的 HTTP 状态码：请求超时、限流与服务端临时错误
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """接口重试策略：指数退避 + 随机抖动，成功时不产生任何等待。
+
+    attempts 为总尝试次数（含首次），第 n 次重试前等待
+    min(max_delay, base_delay * 2 ** (n - 1))，再按 jitter 比例随机缩放。
+    非幂等接口（idempotent=False）只在连接建立失败时重试，避免请求被重复执行。
+    """
+
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    jitter: float = 0.5
+    idempotent: bool = True
+
+    def should_retry(self, error: BaseException) -> bool:
+        """判断异常是否值得重试。"""
+        if isinstance(error, aiohttp.ClientConnectorError):
+            # 连接尚未建立，请求一定没有发出
+            return True
+        if not self.idempotent:
+            return False
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRYABLE_STATUS
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+    def backoff(self, retry: int) -> float:
+        """返回第 retry 次重试前的等待秒数。"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        return delay * (1 - self.jitter * random.random())
+
+# 默认策略
+DEFAULT_RETRY_POLICY = RetryPolicy()
@@ -0,0 +1,150 @@
+# scheduler.py
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 优先级类别，数值越小越优先
+PRIORITY_CONTROL = 0
+PRIORITY_SCENE = 1
+PRIORITY_STATUS = 2
+PRIORITY_DISCOVERY = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_CONTROL: "control",
+    PRIORITY_SCENE: "scene",
+    PRIORITY_STATUS: "status",
+    PRIORITY_DISCOVERY: "discovery",
+}
+
+# 接口对应的优先级，未列出的接口按设备发现处理
+ENDPOINT_PRIORITIES = {
+    "control": PRIORITY_CONTROL,
+    # 令牌刷新会阻塞所有请求，按最高优先级处理
+    "login": PRIORITY_CONTROL,
+    "scene_run": PRIORITY_SCENE,
+    "device_status": PRIORITY_STATUS,
+}
+
+# 可以被控制命令中止并重新发送的接口：只读的列表查询，重复发送不会改变云端状态。
+# 地址激活、厂商令牌、楼层设备等发现步骤虽然也按设备发现的优先级排队，但会修改云端状态，不能中止
+PREEMPTIBLE_ENDPOINTS = frozenset({"address_devices", "user_devices", "scene_query"})
+
+class RequestScheduler:
+    """所有配置条目共享的云端请求调度器。
+
+    同一时间最多 max_inflight 个请求在途，空出的名额总是先分给优先级最高的等待者；
+    状态轮询和设备发现最多只能占用 max_inflight - reserved 个名额，其余留给控制命令与场景。
+    控制命令拿不到名额时会中止一个在途的只读列表查询（PREEMPTIBLE_ENDPOINTS），
+    被中止的请求重新排队后再发送；外部同时取消该请求时，取消照常生效。
+    """
+
+    def __init__(self, max_inflight: int, reserved: int = 0):
+        self._max_inflight = max_inflight
+        self._background_limit = max(1, max_inflight - reserved)
+        self._inflight = 0
+        self._waiters: list[list] = []
+        self._seq = itertools.count()
+        # 在途请求：{任务: 接口}
+        self._running: dict[asyncio.Task, Optional[str]] = {}
+        self._preempted: set[asyncio.Task] = set()
+        # 统计：每个类别的请求数、累计/最大排队时间、被中止次数
+        self._stats = {
+            name: {"requests": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0, "preempted": 0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    def _has_room(self, priority: int) -> bool:
+        limit = self._max_inflight if priority <= PRIORITY_SCENE else self._background_limit
+        return self._inflight < limit
+
+    def _wake(self) -> None:
+        """把空出的名额按优先级分给等待者。"""
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            # 队首优先级最高，它拿不到名额，后面的也拿不到
+            if not self._has_room(priority):
+                break
+            heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._inflight += 1
+            future.set_result(None)
+
+    def _release(self) -> None:
+        self._inflight -= 1
+        self._wake()
+
+    def _preempt(self) -> None:
+        """中止一个在途的只读列表查询，为控制命令腾出名额。"""
+        for task, endpoint in self._running.items():
+            if endpoint in PREEMPTIBLE_ENDPOINTS and task not in self._preempted:
+                self._preempted.add(task)
+                task.cancel()
+                return
+
+    async def _async_acquire(self, priority: int) -> None:
+        if self._has_room(priority) and (not self._waiters or priority < self._waiters[0][0]):
+            self._inflight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._waiters, entry)
+        if priority == PRIORITY_CONTROL:
+            self._preempt()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分到名额但调用方被取消，把名额交给下一个
+                self._release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _record_wait(self, priority: int, waited: float) -> None:
+        stats = self._stats[PRIORITY_NAMES[priority]]
+        stats["requests"] += 1
+        stats["wait_seconds"] += waited
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+        if waited > 1:
+            _LOGGER.debug(f"[{PRIORITY_NAMES[priority]}] 请求排队 {waited * 1000:.0f} ms")
+
+    async def async_run(self, endpoint: Optional[str], send: Callable[[], Awaitable[T]]) -> T:
+        """按 endpoint 的优先级排队，拿到名额后执行 send() 并返回其结果。"""
+        priority = ENDPOINT_PRIORITIES.get(endpoint, PRIORITY_DISCOVERY)
+        task = asyncio.current_task()
+        while True:
+            start = time.monotonic()
+            await self._async_acquire(priority)
+            self._record_wait(priority, time.monotonic() - start)
+            self._running[task] = endpoint
+            try:
+                return await send()
+            except asyncio.CancelledError:
+                if task not in self._preempted or task.cancelling() != 1:
+                    # 不是中止，或者中止的同时还有外部取消（条目卸载、发现链路中止），照常取消
+                    raise
+                # 只被控制命令中止：撤销这次取消，重新排队
+                self._preempted.discard(task)
+                task.uncancel()
+                self._stats[PRIORITY_NAMES[priority]]["preempted"] += 1
+                _LOGGER.debug(f"{endpoint} 请求让位给控制命令，重新排队")
+            finally:
+                self._running.pop(task, None)
+                self._preempted.discard(task)
+                self._release()
+
+    def stats(self) -> dict[str, dict]:
+        """返回各优先级类别的排队统计。"""
+        return {
+            name: {**stats, "wait_seconds": round(stats["wait_seconds"], 3), "max_wait_seconds": round(stats["max_wait_seconds"], 3)}
+            for name, stats in self._stats.items()
+        }
@@ -0,0 +1,131 @@
+# services.py
+import asyncio
+import logging
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from .const import DOMAIN, BULK_MAX_CONCURRENCY
+from .api import async_Control_SwitchOrLight
+from .models import get_model
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_BULK_SET = "bulk_set"
+ATTR_VIRTUAL_NUMBERS = "virtual_numbers"
+ATTR_ROOMS = "rooms"
+ATTR_STATE = "state"
+
+BULK_SET_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_ENTITY_ID, default=[]): cv.entity_ids,
+        vol.Optional(ATTR_VIRTUAL_NUMBERS, default=[]): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_ROOMS, default=[]): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_STATE): cv.boolean,
+    }
+)
+
+def _find_virtual_model(hass: HomeAssistant, virtual_number: str):
+    """在所有已加载的配置条目中查找 virtualNumber，返回 (entry_id, 设备, 虚拟模型)。"""
+    for entry_id, index in hass.data[DOMAIN]["devices"].items():
+        found = index.virtual_model(virtual_number)
+        if found is not None:
+            return entry_id, *found
+    return None
+
+async def _async_bulk_set(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """批量设置开关状态，返回每个设备的执行结果。"""
+    state = call.data[ATTR_STATE]
+    entity_registry = er.async_get(hass)
+
+    # 实体的 unique_id 就是 virtualNumber，统一换算成 virtualNumber 处理
+    targets: dict[str, str | None] = {}
+    for entity_id in call.data[ATTR_ENTITY_ID]:
+        entry = entity_registry.async_get(entity_id)
+        if entry is None or entry.platform != DOMAIN:
+            raise ServiceValidationError(f"{entity_id} 不是安心加实体")
+        targets[entry.unique_id] = entity_id
+    for virtual_number in call.data[ATTR_VIRTUAL_NUMBERS]:
+        targets.setdefault(virtual_number, None)
+    # 按房间选择时取该房间所有开关回路
+    for room in call.data[ATTR_ROOMS]:
+        for index in hass.data[DOMAIN]["devices"].values():
+            for device in index.in_room(room):
+                if state not in get_model(device.model_type).payloads:
+                    continue
+                for virtual_model in device.virtual_models:
+                    if virtual_model.virtual_number:
+                        targets.setdefault(virtual_model.virtual_number, None)
+    if not targets:
+        raise ServiceValidationError("至少需要指定一个实体、virtualNumber 或房间")
+
+    semaphore = asyncio.Semaphore(BULK_MAX_CONCURRENCY)
+
+    async def _async_set(virtual_number: str) -> dict:
+        report = {"virtual_number": virtual_number, "entity_id": targets[virtual_number], "success": False}
+        found = _find_virtual_model(hass, virtual_number)
+        if found is None:
+            report["error"] = "未找到设备"
+            return report
+        entry_id, device, virtual_model = found
+        model_type = virtual_model.model_type
+        if state not in get_model(model_type).payloads:
+            report["error"] = f"不支持的设备类型 {model_type}"
+            return report
+        client = hass.data[DOMAIN][entry_id]["client"]
+        name = f"{device.room_name}{virtual_model.virtual_name}"
+        async with semaphore:
+            result = await async_Control_SwitchOrLight(client, name, virtual_number, model_type, state)
+        report["entry_id"] = entry_id
+        report["address_id"] = device.address_id
+        report["eq_number"] = device.eq_number
+        if result is None:
+            report["error"] = "被后续命令取代"
+        elif not result:
+            report["error"] = "云端执行失败"
+        else:
+            report["success"] = True
+        return report
+
+    results = await asyncio.gather(*(_async_set(virtual_number) for virtual_number in targets))
+
+    # 成功的设备乐观地并入所属协调器的快照并等待确认，每个协调器只通知一次受影响的实体
+    touched: dict[int, tuple] = {}
+    for report in results:
+        if not report["success"]:
+            continue
+        coordinator = hass.data[DOMAIN][report["entry_id"]]["coordinators"].get(report["address_id"])
+        if coordinator is not None:
+            coordinator.async_expect(report["eq_number"], {report["virtual_number"]: state})
+            touched.setdefault(id(coordinator), (coordinator, []))[1].append(report["virtual_number"])
+    for coordinator, virtual_numbers in touched.values():
+        coordinator.async_notify(virtual_numbers)
+
+    succeeded = sum(1 for report in results if report["success"])
+    _LOGGER.info(f"批量设置完成: 成功 {succeeded}, 失败 {len(results) - succeeded}")
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": [
+            {key: value for key, value in report.items() if key not in ("entry_id", "address_id", "eq_number")}
+            for report in results
+        ],
+    }
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """注册集成级服务。"""
+    if hass.services.has_service(DOMAIN, SERVICE_BULK_SET):
+        return
+
+    async def _async_handle_bulk_set(call: ServiceCall) -> ServiceResponse:
+        return await _async_bulk_set(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_SET,
+        _async_handle_bulk_set,
+        schema=BULK_SET_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,90 @@
+# status.py
+from typing import Any, Optional
+
+def _parse_bool(value: Any) -> Optional[bool]:
+    """把云端返回的 "1"/"0"、1/0、true/false 等取值转换为布尔值，无法识别时返回 None。"""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    text = str(value).strip().lower()
+    if text in ("1", "true", "on", "online"):
+        return True
+    if text in ("0", "false", "off", "offline"):
+        return False
+    return None
+
+def _parse_int(value: Any) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+# statusList 中已知的属性：{属性名: (DeviceStatus 字段, 解析函数)}
+KNOWN_PROPERTIES = {
+    "isonoff": ("is_on", _parse_bool),
+    "curtain_position": ("position", _parse_int),
+    "position": ("position", _parse_int),
+    "online": ("online", _parse_bool),
+}
+
+class DeviceStatus:
+    """单个 virtualNumber 的状态记录。
+
+    已知属性按设备类型的解析表转换为类型化字段，statusList 的全部原始属性保存在 properties 中。
+    每次轮询原地更新同一个对象，只有内容变化时才替换 properties。
+    """
+
+    __slots__ = ("virtual_number", "eq_number", "is_on", "position", "online", "properties", "known")
+
+    def __init__(self, virtual_number: str, eq_number: Optional[str] = None, known: Optional[dict] = None):
+        self.virtual_number = virtual_number
+        self.eq_number = eq_number
+        # statusList 的解析表，由设备类型决定，默认解析所有已知属性
+        self.known = KNOWN_PROPERTIES if known is None else known
+        self.is_on: Optional[bool] = None
+        self.position: Optional[int] = None
+        self.online: Optional[bool] = None
+        self.properties: dict[str, Any] = {}
+
+    def update(self, eq_number: Optional[str], status_list: dict[str, Any], online: Any = None) -> bool:
+        """用一次 eqNumberBatch 返回的数据更新记录，返回内容是否有变化。"""
+        online = _parse_bool(online)
+        if (
+            status_list == self.properties
+            and eq_number == self.eq_number
+            and (online is None or online == self.online)
+        ):
+            return False
+        self.eq_number = eq_number
+        self.properties = dict(status_list)
+        for key, value in status_list.items():
+            known = self.known.get(key)
+            if known is not None:
+                field, parse = known
+                setattr(self, field, parse(value))
+        if online is not None and "online" not in status_list:
+            self.online = online
+        return True
+
+    def assume(self, is_on: bool) -> None:
+        """乐观地设置开关状态，并清空原始属性，保证下一次云端数据一定会重新解析。"""
+        self.is_on = is_on
+        self.properties = {}
+
+    def snapshot(self) -> Optional[list]:
+        """紧凑的最近已知状态 [is_on, position]，两者都未知时返回 None。"""
+        if self.is_on is None and self.position is None:
+            return None
+        return [self.is_on, self.position]
+
+    def restore(self, snapshot: list) -> None:
+        """用 snapshot() 的结果恢复状态；properties 保持为空，第一次轮询一定会重新解析。"""
+        self.is_on = _parse_bool(snapshot[0]) if len(snapshot) > 0 else None
+        self.position = _parse_int(snapshot[1]) if len(snapshot) > 1 else None
+
+    def __repr__(self) -> str:
+        return (
+            f"DeviceStatus({self.virtual_number}, is_on={self.is_on}, "
+            f"position={self.position}, online={self.online})"
+        )
@@ -0,0 +1,132 @@
+# store.py
+import logging
+from typing import Optional
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from .const import DOMAIN
+from .device import Device, DeviceIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+class AnxinJiaStore:
+    """按配置条目持久化最近一次成功获取的设备列表、地址、各地址的场景列表与最近已知状态。
+
+    重启时直接用缓存创建实体并恢复状态，云端发现链路与第一次轮询在后台进行。
+    设备登记完成后调用 attach，之后缓存中的设备列表由设备索引里的 Device 对象生成，
+    不再常驻一份云端返回的原始设备列表。
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        # 只在 attach 之前保存读取到的设备列表
+        self.devices: Optional[list[dict]] = None
+        self._index: Optional[DeviceIndex] = None
+        self.address_id: Optional[str] = None
+        self.address_ids: list[str] = []
+        # {addressId: 场景列表}
+        self.scenes: Optional[dict[str, list[dict]]] = None
+        # {virtualNumber: [is_on, position]}，在卸载或关闭时写入
+        self.snapshot: dict[str, list] = {}
+
+    async def async_load(self) -> bool:
+        """读取缓存，存在可用的设备列表时返回 True。"""
+        data = await self._store.async_load()
+        if not isinstance(data, dict):
+            return False
+        self.devices = data.get("devices") or None
+        self.address_id = data.get("address_id")
+        self.address_ids = data.get("address_ids") or ([self.address_id] if self.address_id else [])
+        scenes = data.get("scenes")
+        if isinstance(scenes, list):
+            # 旧版本缓存只保存了默认地址的场景列表
+            scenes = {self.address_id: scenes} if self.address_id else None
+        self.scenes = scenes
+        snapshot = data.get("snapshot")
+        self.snapshot = snapshot if isinstance(snapshot, dict) else {}
+        return bool(self.devices)
+
+    def attach(self, index: DeviceIndex) -> None:
+        """设备已登记到索引：之后从索引生成设备列表，并释放读取到的原始列表。"""
+        self._index = index
+        self.devices = None
+
+    def _device_dicts(self) -> Optional[list[dict]]:
+        """当前的设备列表。"""
+        if self._index is not None:
+            return [device.to_dict() for device in self._index] or None
+        return self.devices
+
+    async def async_save(self, devices: Optional[list[dict]] = None) -> None:
+        """写入当前缓存；devices 为 None 时使用当前的设备列表。"""
+        await self._store.async_save({
+            "devices": devices if devices is not None else self._device_dicts(),
+            "address_id": self.address_id,
+            "address_ids": self.address_ids,
+            "scenes": self.scenes,
+            "snapshot": self.snapshot,
+        })
+
+    async def async_update_devices(self, devices: list[dict], address_id: Optional[str], address_ids: Optional[list[str]] = None) -> bool:
+        """更新设备列表与地址，返回设备结构是否发生了变化；没有变化时不写入存储。
+
+        设备列表先经 Device 规范化，与从索引生成的列表格式一致，只用于比较和写入，不会保留。
+        """
+        address_ids = address_ids or ([address_id] if address_id else [])
+        devices = [Device(device).to_dict() for device in devices]
+        changed = (
+            address_id != self.address_id
+            or address_ids != self.address_ids
+            or device_signature(devices) != device_signature(self._device_dicts() or [])
+        )
+        if not changed:
+            return False
+        if self._index is None:
+            self.devices = devices
+        self.address_id = address_id
+        self.address_ids = address_ids
+        await self.async_save(devices)
+        return True
+
+    async def async_update_scenes(self, scenes: Optional[dict[str, list[dict]]]) -> bool:
+        """更新各地址的场景列表，返回场景是否发生了变化；没有变化时不写入存储。"""
+        if scene_signature(scenes or {}) == scene_signature(self.scenes or {}):
+            return False
+        self.scenes = scenes
+        await self.async_save()
+        return True
+
+    async def async_update_snapshot(self, snapshot: dict[str, list]) -> None:
+        """写入实体的最近已知状态。"""
+        self.snapshot = snapshot
+        await self.async_save()
+
+    async def async_remove(self) -> None:
+        """删除缓存文件。"""
+        await self._store.async_remove()
+
+def device_signature(devices: list[dict]) -> set:
+    """提取决定实体结构的字段，忽略 online 等频繁变化的字段。"""
+    return {
+        (
+            device.get("eqNumber"),
+            device.get("eqName"),
+            device.get("modelType"),
+            device.get("roomName"),
+            device.get("addressId"),
+            tuple(
+                (vm.get("virtualNumber"), vm.get("virtualName"), vm.get("modelType"))
+                for vm in device.get("virtualModels") or []
+            ),
+        )
+        for device in devices
+    }
+
+def scene_signature(scenes: dict[str, list[dict]]) -> set:
+    """提取各地址场景的 id 与名称。"""
+    return {
+        (address_id, scene.get("id"), scene.get("sceneName"))
+        for address_id, address_scenes in scenes.items()
+        for scene in address_scenes or []
+    }
@@ -0,0 +1,16 @@
+'''
+测试只覆盖不依赖 Home Assistant 的纯 asyncio 模块。
+
+与 benchmarks 相同，以不执行 __init__.py 的方式加载集成包，模块内的相对导入照常可用。
+'''
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(ROOT, "custom_components", "anxinjia_iot")
+
+if "anxinjia_iot" not in sys.modules:
+    package = types.ModuleType("anxinjia_iot")
+    package.__path__ = [PACKAGE_DIR]
+    sys.modules["anxinjia_iot"] = package
@@ -0,0 +1,81 @@
+import asyncio
+
+from anxinjia_iot.commands import CommandQueues
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_commands_for_one_key_are_serialized_and_last_write_wins():
+    async def main():
+        queues = CommandQueues()
+        sent = []
+        release = asyncio.Event()
+
+        def command(value):
+            async def send():
+                sent.append(value)
+                if value == "first":
+                    await release.wait()
+                return True
+            return send
+
+        first = asyncio.create_task(queues.async_submit("vn1", command("first")))
+        await _settle()
+        second = asyncio.create_task(queues.async_submit("vn1", command("second")))
+        third = asyncio.create_task(queues.async_submit("vn1", command("third")))
+        await _settle()
+        # 第一条命令在途时，第二条被第三条取代
+        release.set()
+        assert await asyncio.gather(first, second, third) == [True, None, True]
+        assert sent == ["first", "third"]
+        assert queues.stats() == {"sent": 2, "superseded": 1}
+
+    asyncio.run(main())
+
+def test_different_keys_do_not_wait_for_each_other():
+    async def main():
+        queues = CommandQueues()
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return True
+
+        async def fast():
+            return True
+
+        slow_task = asyncio.create_task(queues.async_submit("vn1", slow))
+        await _settle()
+        assert await queues.async_submit("vn2", fast) is True
+        release.set()
+        assert await slow_task is True
+
+    asyncio.run(main())
+
+def test_cancelled_pending_command_does_not_block_later_ones():
+    async def main():
+        queues = CommandQueues()
+        release = asyncio.Event()
+        sent = []
+
+        def command(value):
+            async def send():
+                sent.append(value)
+                if value == "first":
+                    await release.wait()
+                return True
+            return send
+
+        first = asyncio.create_task(queues.async_submit("vn1", command("first")))
+        await _settle()
+        second = asyncio.create_task(queues.async_submit("vn1", command("second")))
+        await _settle()
+        second.cancel()
+        await _settle()
+        release.set()
+        assert await first is True
+        assert await queues.async_submit("vn1", command("third")) is True
+        assert sent == ["first", "third"]
+
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from anxinjia_iot.paging import DevicePageError, Page, async_iter_pages
+
+def _devices(start, count):
+    return [{"eqNumber": f"eq{i}"} for i in range(start, start + count)]
+
+def _collect(fetch_page, **kwargs):
+    async def main():
+        pages = []
+        async for items in async_iter_pages(fetch_page, **kwargs):
+            pages.append(items)
+        return pages
+    return asyncio.run(main())
+
+def _server(total, page_cap, with_total=True):
+    """模拟把 pageSize 截断为 page_cap 的列表接口，返回 fetch_page 与请求过的页号。"""
+    requested = []
+
+    async def fetch_page(page_no):
+        requested.append(page_no)
+        start = (page_no - 1) * page_cap
+        items = _devices(start, max(0, min(page_cap, total - start)))
+        return Page(items, total if with_total else None)
+
+    return fetch_page, requested
+
+def test_short_pages_from_a_capped_server_do_not_truncate_the_list():
+    fetch_page, _ = _server(total=45, page_cap=20)
+    pages = _collect(fetch_page, page_size=100)
+    assert [len(items) for items in pages] == [20, 20, 5]
+
+def test_capped_server_without_total_stops_on_a_short_page():
+    fetch_page, _ = _server(total=45, page_cap=20, with_total=False)
+    pages = _collect(fetch_page, page_size=100)
+    assert sum(len(items) for items in pages) == 45
+
+def test_total_bounds_the_requested_pages():
+    fetch_page, requested = _server(total=250, page_cap=100)
+    pages = _collect(fetch_page, page_size=100, lookahead=2)
+    assert sum(len(items) for items in pages) == 250
+    assert max(requested) == 3
+
+def test_server_ignoring_page_number_stops_on_repeated_page():
+    async def fetch_page(page_no):
+        return Page(_devices(0, 100))
+
+    pages = _collect(fetch_page, page_size=100)
+    assert len(pages) == 1
+
+def test_hard_page_limit():
+    async def fetch_page(page_no):
+        return Page(_devices(page_no * 100, 100))
+
+    pages = _collect(fetch_page, page_size=100, max_pages=5)
+    assert len(pages) == 5
+
+def test_failed_page_raises_and_cancels_the_window():
+    cancelled = []
+
+    async def fetch_page(page_no):
+        if page_no == 2:
+            # 让同一窗口内的第 3 页先开始请求
+            await asyncio.sleep(0)
+            return None
+        if page_no > 2:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(page_no)
+                raise
+        return Page(_devices(0, 100))
+
+    with pytest.raises(DevicePageError) as excinfo:
+        _collect(fetch_page, page_size=100, lookahead=3)
+    assert excinfo.value.page_no == 2
+    assert cancelled == [3, 4]
+
+def test_small_list_requests_one_extra_page_without_lookahead():
+    fetch_page, requested = _server(total=7, page_cap=100, with_total=False)
+    pages = _collect(fetch_page, page_size=100, lookahead=3)
+    assert [len(items) for items in pages] == [7]
+    assert requested == [1, 2]
+
+def test_failed_page_after_a_short_first_page_ends_the_list():
+    async def fetch_page(page_no):
+        return Page(_devices(0, 7)) if page_no == 1 else None
+
+    pages = _collect(fetch_page, page_size=100)
+    assert [len(items) for items in pages] == [7]
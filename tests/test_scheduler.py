@@ -0,0 +1,120 @@
+import asyncio
+
+from anxinjia_iot.scheduler import RequestScheduler
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+class _Request:
+    """可以从外部控制何时完成的请求，记录被发送的次数。"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def send(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.result
+
+def test_control_preempts_read_only_discovery_and_it_is_resent():
+    async def main():
+        scheduler = RequestScheduler(1)
+        discovery = _Request("devices")
+        control = _Request(True)
+        discovery_task = asyncio.create_task(scheduler.async_run("address_devices", discovery.send))
+        await _settle()
+        control_task = asyncio.create_task(scheduler.async_run("control", control.send))
+        await _settle()
+        # 控制命令拿到名额，设备列表查询被中止后重新排队
+        assert control.calls == 1
+        assert not discovery_task.done()
+        control.release.set()
+        assert await control_task is True
+        discovery.release.set()
+        assert await discovery_task == "devices"
+        assert discovery.calls == 2
+        assert scheduler.stats()["discovery"]["preempted"] == 1
+
+    asyncio.run(main())
+
+def test_state_changing_discovery_is_not_preempted():
+    async def main():
+        scheduler = RequestScheduler(1)
+        activate = _Request(True)
+        control = _Request(True)
+        activate_task = asyncio.create_task(scheduler.async_run("active_address", activate.send))
+        await _settle()
+        control_task = asyncio.create_task(scheduler.async_run("control", control.send))
+        await _settle()
+        # 地址激活会修改云端状态，控制命令只能等待
+        assert control.calls == 0
+        activate.release.set()
+        assert await activate_task is True
+        control.release.set()
+        assert await control_task is True
+        assert activate.calls == 1
+        assert scheduler.stats()["discovery"]["preempted"] == 0
+
+    asyncio.run(main())
+
+def test_external_cancel_after_preemption_is_not_swallowed():
+    async def main():
+        scheduler = RequestScheduler(1)
+        discovery = _Request("devices")
+        control = _Request(True)
+        discovery_task = asyncio.create_task(scheduler.async_run("user_devices", discovery.send))
+        await _settle()
+        control_task = asyncio.create_task(scheduler.async_run("control", control.send))
+        # 控制命令已经发起中止，条目卸载时又取消了同一个请求
+        await asyncio.sleep(0)
+        discovery_task.cancel()
+        await _settle()
+        assert discovery_task.cancelled()
+        assert discovery.calls == 1
+        control.release.set()
+        assert await control_task is True
+
+    asyncio.run(main())
+
+def test_waiters_are_served_by_priority():
+    async def main():
+        scheduler = RequestScheduler(1)
+        order = []
+        blocker = _Request(None)
+        blocker_task = asyncio.create_task(scheduler.async_run("device_status", blocker.send))
+        await _settle()
+
+        async def record(name):
+            order.append(name)
+
+        tasks = [
+            asyncio.create_task(scheduler.async_run("device_status", lambda: record("status"))),
+            asyncio.create_task(scheduler.async_run("scene_run", lambda: record("scene"))),
+        ]
+        await _settle()
+        blocker.release.set()
+        await asyncio.gather(blocker_task, *tasks)
+        assert order == ["scene", "status"]
+
+    asyncio.run(main())
+
+def test_reserved_slots_are_kept_for_commands():
+    async def main():
+        scheduler = RequestScheduler(2, reserved=1)
+        status = [_Request(i) for i in range(2)]
+        tasks = [asyncio.create_task(scheduler.async_run("device_status", r.send)) for r in status]
+        await _settle()
+        # 状态轮询最多占用 max_inflight - reserved 个名额
+        assert [r.calls for r in status] == [1, 0]
+        control = _Request(True)
+        control_task = asyncio.create_task(scheduler.async_run("control", control.send))
+        await _settle()
+        assert control.calls == 1
+        for r in (control, *status):
+            r.release.set()
+        await asyncio.gather(control_task, *tasks)
+
+    asyncio.run(main())